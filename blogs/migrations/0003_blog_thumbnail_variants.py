@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0002_blog_meta_description_en_blog_meta_description_hr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Responsive renditions generated from the thumbnail', verbose_name='Thumbnail Variants'),
+        ),
+    ]
@@ -9,12 +9,25 @@ def blog_thumbnail_upload_path(instance, filename):
     return f"blogs/thumbnails/{filename}"
 
 
+class BlogQuerySet(models.QuerySet):
+    # Columns of the list cards and pickers, everything but the description HTML
+    LISTING_FIELDS = [
+        'id', 'title_hr', 'title_en', 'slug_hr', 'slug_en', 'short_description_hr', 'short_description_en',
+        'thumbnail', 'thumbnail_variants', 'thumbnail_width', 'thumbnail_height', 'created_at',
+    ]
+    
+    def for_listing(self):
+        """Load only the columns list pages use, leaving out the large rich text fields"""
+        return self.only(*self.LISTING_FIELDS)
+
+
 class Blog(models.Model):
     # Croatian fields
     title_hr = models.CharField(_('Title (Croatian)'), max_length=200)
     slug_hr = models.SlugField(_('Slug (Croatian)'), max_length=200, unique=True)
     short_description_hr = models.TextField(_('Short Description (Croatian)'), max_length=500)
     full_description_hr = RichTextUploadingField(_('Full Description (Croatian)'))
+    full_description_hr_rendered = models.TextField(_('Rendered Full Description (Croatian)'), blank=True, editable=False, help_text=_('Post-processed HTML, generated on save'))
     meta_description_hr = models.CharField(_('Meta Description (Croatian)'), max_length=160, blank=True)
     
     # English fields
@@ -22,16 +35,26 @@ class Blog(models.Model):
     slug_en = models.SlugField(_('Slug (English)'), max_length=200, unique=True)
     short_description_en = models.TextField(_('Short Description (English)'), max_length=500)
     full_description_en = RichTextUploadingField(_('Full Description (English)'))
+    full_description_en_rendered = models.TextField(_('Rendered Full Description (English)'), blank=True, editable=False, help_text=_('Post-processed HTML, generated on save'))
     meta_description_en = models.CharField(_('Meta Description (English)'), max_length=160, blank=True)
     
     # Common fields
     thumbnail = models.ImageField(_('Thumbnail Image'), upload_to=blog_thumbnail_upload_path, help_text=_('Supports WebP format'))
+    thumbnail_variants = models.JSONField(_('Thumbnail Variants'), default=dict, blank=True, editable=False, help_text=_('Responsive renditions generated from the thumbnail'))
+    thumbnail_width = models.PositiveIntegerField(_('Thumbnail Width'), null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(_('Thumbnail Height'), null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(_('Active'), default=True)
     
+    objects = BlogQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the list pages
+            models.Index(fields=['created_at', 'id'], name='blog_created_id_idx'),
+        ]
         verbose_name = _('Blog')
         verbose_name_plural = _('Blogs')
     
@@ -62,6 +85,10 @@ class Blog(models.Model):
         """Get full description in specified language"""
         return getattr(self, f'full_description_{language_code}', self.full_description_hr)
     
+    def get_full_description_html(self, language_code='hr'):
+        """Get the full description HTML rendered at save time, or the raw HTML if not rendered yet"""
+        return getattr(self, f'full_description_{language_code}_rendered', '') or self.get_full_description(language_code)
+    
     def get_meta_description(self, language_code='hr'):
         """Get meta description in specified language"""
         return getattr(self, f'meta_description_{language_code}', self.meta_description_hr) or self.get_short_description(language_code)
@@ -0,0 +1,114 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from core.models import ImageVariantSet
+from naomi_face_studio import image_variants
+
+from .models import Blog
+
+
+@override_settings(USE_R2=True, AWS_LOCATION='media')
+class ReplacedFileDeletionTests(TransactionTestCase):
+    """Files a save replaces are deleted once the object's references are updated"""
+    
+    def setUp(self):
+        self.deleted = []
+        patches = [
+            mock.patch('naomi_face_studio.media_ops.delete_files_from_r2', side_effect=self.record_delete),
+            # No image files in tests, variants are not generated
+            mock.patch('naomi_face_studio.image_variants.generate_variants', side_effect=self.fake_variants),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def record_delete(self, file_paths):
+        self.deleted.extend(file_paths)
+        return {}
+    
+    def fake_variants(self, name, storage, formats=None):
+        return {'source': name, 'width': 10, 'height': 10, 'variants': []}
+    
+    def create_blog(self, slug, thumbnail):
+        return Blog.objects.create(
+            title_hr=slug, title_en=slug, slug_hr=slug, slug_en=f'{slug}-en',
+            short_description_hr='s', short_description_en='s',
+            full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+            thumbnail=thumbnail,
+        )
+    
+    def test_replaced_thumbnail_deleted_in_autocommit(self):
+        blog = self.create_blog('a', 'blogs/thumbnails/old.jpg')
+        blog.thumbnail = 'blogs/thumbnails/new.jpg'
+        blog.save()
+        self.assertEqual(self.deleted, ['blogs/thumbnails/old.jpg'])
+    
+    def test_replaced_thumbnail_deleted_after_commit(self):
+        blog = self.create_blog('a', 'blogs/thumbnails/old.jpg')
+        with transaction.atomic():
+            blog.thumbnail = 'blogs/thumbnails/new.jpg'
+            blog.save()
+            self.assertEqual(self.deleted, [])
+        self.assertEqual(self.deleted, ['blogs/thumbnails/old.jpg'])
+    
+    def test_shared_thumbnail_kept(self):
+        blog = self.create_blog('a', 'blogs/thumbnails/shared.jpg')
+        self.create_blog('b', 'blogs/thumbnails/shared.jpg')
+        blog.thumbnail = 'blogs/thumbnails/new.jpg'
+        blog.save()
+        self.assertEqual(self.deleted, [])
+    
+    def test_removed_description_image_deleted(self):
+        blog = self.create_blog('a', 'blogs/thumbnails/old.jpg')
+        blog.full_description_hr = '<p><img src="/media/uploads/2026/10/18/photo.jpg"></p>'
+        blog.save()
+        blog.full_description_hr = '<p>x</p>'
+        blog.save()
+        self.assertEqual(self.deleted, ['uploads/2026/10/18/photo.jpg'])
+    
+    def test_removed_description_image_variants_deleted(self):
+        ImageVariantSet.objects.create(path='uploads/2026/10/18/photo.jpg', data={
+            'source': 'uploads/2026/10/18/photo.jpg', 'width': 1200, 'height': 800,
+            'variants': [{'name': 'uploads/2026/10/18/variants/photo-480w.webp', 'format': 'webp', 'width': 480, 'height': 320}],
+        })
+        blog = self.create_blog('a', 'blogs/thumbnails/old.jpg')
+        blog.full_description_hr = '<p><img src="/media/uploads/2026/10/18/photo.jpg"></p>'
+        blog.save()
+        blog.full_description_hr = '<p>x</p>'
+        blog.save()
+        self.assertEqual(
+            sorted(self.deleted),
+            ['uploads/2026/10/18/photo.jpg', 'uploads/2026/10/18/variants/photo-480w.webp'],
+        )
+        self.assertFalse(ImageVariantSet.objects.exists())
+
+
+class VariantUpdateTests(TransactionTestCase):
+    """Writes that bypass save() still move updated_at, which ETags and export fingerprints are built from"""
+    
+    def test_generated_variants_bump_updated_at(self):
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            blog = Blog.objects.create(
+                title_hr='a', title_en='a', slug_hr='a', slug_en='a-en',
+                short_description_hr='s', short_description_en='s',
+                full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+            )
+            saved_at = Blog.objects.values_list('updated_at', flat=True).get(pk=blog.pk)
+            Blog.objects.filter(pk=blog.pk).update(thumbnail='blogs/thumbnails/new.jpg')
+            blog.thumbnail = 'blogs/thumbnails/new.jpg'
+            image_variants.update_thumbnail_variants(blog)
+        self.assertGreater(Blog.objects.values_list('updated_at', flat=True).get(pk=blog.pk), saved_at)
+    
+    def test_render_rich_text_bumps_updated_at(self):
+        blog = Blog.objects.create(
+            title_hr='a', title_en='a', slug_hr='a', slug_en='a-en',
+            short_description_hr='s', short_description_en='s',
+            full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+        )
+        saved_at = Blog.objects.values_list('updated_at', flat=True).get(pk=blog.pk)
+        call_command('render_rich_text', stdout=StringIO())
+        self.assertGreater(Blog.objects.values_list('updated_at', flat=True).get(pk=blog.pk), saved_at)
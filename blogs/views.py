@@ -1,17 +1,24 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.translation import get_language
+from core import page_cache
+from core.conditional import conditional_detail, conditional_list
+from core.pagination import KeysetPaginator
 from .models import Blog
 
+LIST_PER_PAGE = 6
 
+
+@conditional_list(Blog)
 def blog_list(request):
     """List all blogs with pagination"""
     language_code = get_language()[:2]
-    blogs = Blog.objects.filter(is_active=True).order_by('-created_at')
+    blogs = Blog.objects.filter(is_active=True).for_listing().order_by('-created_at')
     
-    paginator = Paginator(blogs, 6)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(blogs, LIST_PER_PAGE)
+    if 'page' in request.GET:
+        # Page number links from before keyset pagination
+        return redirect(request.path + paginator.get_page_number_query(request.GET['page']), permanent=True)
+    page_obj = paginator.get_page(request.GET.get('after'))
     
     context = {
         'page_obj': page_obj,
@@ -21,18 +28,21 @@ def blog_list(request):
     return render(request, 'blogs/list.html', context)
 
 
+@conditional_detail(Blog)
 def blog_detail(request, slug):
     """Individual blog detail page"""
     language_code = get_language()[:2]
     
-    if language_code == 'en':
-        blog = get_object_or_404(Blog, slug_en=slug, is_active=True)
-    else:
-        blog = get_object_or_404(Blog, slug_hr=slug, is_active=True)
+    def get_context():
+        # Only runs when the page is not cached
+        if language_code == 'en':
+            blog = get_object_or_404(Blog, slug_en=slug, is_active=True)
+        else:
+            blog = get_object_or_404(Blog, slug_hr=slug, is_active=True)
+        return {
+            'blog': blog,
+            'language_code': language_code,
+        }
     
-    context = {
-        'blog': blog,
-        'language_code': language_code,
-    }
-    return render(request, 'blogs/detail.html', context)
+    return page_cache.cached_detail(request, Blog, language_code, slug, 'blogs/detail.html', get_context)
 
@@ -3,12 +3,12 @@ from django.contrib import messages
 from django.utils.translation import get_language, activate, gettext as _
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from honeypot.decorators import check_honeypot
 from django_ratelimit.decorators import ratelimit
 from .models import ContactSubmission
-from core.models import EmailCollection
+from core.models import EmailCollection, EmailOutbox
 import logging
 
 logger = logging.getLogger('contacts')
@@ -36,26 +36,28 @@ def contact_form(request):
             messages.error(request, _('Please fill in all required fields.'))
             return render(request, 'contacts/form.html', {'language_code': language_code})
         
-        # Create contact submission
-        submission = ContactSubmission.objects.create(
-            first_name=first_name,
-            last_name=last_name,
-            mobile=mobile,
-            email=email,
-            message=message_text,
-        )
-        
-        # Collect email (only if not already archived)
-        EmailCollection.collect_email(
-            email=email,
-            source='Contact Form',
-            first_name=first_name,
-            last_name=last_name,
-            mobile=mobile,
-        )
-        
-        # Send email to admin
-        send_contact_email(submission, language_code)
+        # Save the submission and queue its email in one transaction
+        with transaction.atomic():
+            # Create contact submission
+            submission = ContactSubmission.objects.create(
+                first_name=first_name,
+                last_name=last_name,
+                mobile=mobile,
+                email=email,
+                message=message_text,
+            )
+            
+            # Collect email (only if not already archived)
+            EmailCollection.collect_email(
+                email=email,
+                source='Contact Form',
+                first_name=first_name,
+                last_name=last_name,
+                mobile=mobile,
+            )
+            
+            # Queue email to admin
+            send_contact_email(submission, language_code)
         
         messages.success(request, _('Thank you for your message! We will get back to you soon.'))
         return redirect('contacts:form')
@@ -82,15 +84,12 @@ def send_contact_email(submission, language_code='hr'):
         subject = _('New Contact Form Submission from %(name)s') % {'name': f'{submission.first_name} {submission.last_name}'}
         message = render_to_string('contacts/emails/admin_notification.html', context)
         
-        send_mail(
+        EmailOutbox.enqueue(
             subject,
             message,
-            settings.DEFAULT_FROM_EMAIL,
             [settings.ADMIN_EMAIL],
-            html_message=message,
-            fail_silently=False,
         )
-        logger.info(f"Contact form email sent to admin for submission ID: {submission.id} from {submission.email}")
+        logger.info(f"Contact form email queued to admin for submission ID: {submission.id} from {submission.email}")
     except Exception as e:
         logger.error(f"Failed to send contact form email for submission ID: {submission.id}. Error: {str(e)}", exc_info=True)
         raise
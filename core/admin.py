@@ -3,7 +3,8 @@ from django.contrib.auth.models import Group, User
 from django.http import HttpResponse
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
-from .models import EmailCollection
+from django.utils import timezone
+from .models import EmailCollection, EmailOutbox
 import csv
 
 # Unregister Groups from admin
@@ -61,3 +62,21 @@ class EmailCollectionAdmin(admin.ModelAdmin):
         return response
     export_as_text.short_description = _("Export selected emails as text (one per line)")
 
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['subject', 'body', 'html_body', 'from_email', 'to', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+    
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    recipients.short_description = _('To')
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, _('%(count)d emails queued for immediate delivery.') % {'count': updated})
+    retry_now.short_description = _("Retry selected emails now")
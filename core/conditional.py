@@ -0,0 +1,100 @@
+"""
+Conditional GET for the public content pages.
+
+The list and detail views of treatments, blogs and education items send
+an ETag and Last-Modified derived from the updated_at of the content (one
+aggregate query), and answer 304 Not Modified before any template is
+rendered. Pages embed the visitor's header (login state, CSRF token), so
+the ETag also covers the user and the CSRF cookie, and responses are
+private: browsers revalidate them, shared caches do not store them.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+
+def get_list_state(model):
+    """(last change, active count) of a content model; the count catches deletions"""
+    state = model.objects.aggregate(
+        # All rows, so deactivating an item counts as a change
+        updated_at=Max('updated_at'),
+        count=Count('id', filter=Q(is_active=True)),
+    )
+    return state['updated_at'], state['count']
+
+
+def get_detail_state(model, slug):
+    """(last change, pk) of the active object with this slug in the active language, or None"""
+    language_code = get_language()[:2]
+    row = model.objects.filter(
+        **{f'slug_{language_code}': slug, 'is_active': True}
+    ).values_list('updated_at', 'pk').first()
+    return tuple(row) if row else None
+
+
+def _has_messages(request):
+    # len() loads the messages without marking them as shown
+    return len(get_messages(request)) > 0
+
+
+def conditional_page(get_state):
+    """
+    Add ETag/Last-Modified validators to a content view. get_state(request,
+    *args, **kwargs) returns a tuple starting with the last change of the
+    shown content, or None to serve the view without validators (e.g. 404).
+    """
+    def decorator(view):
+        def get_cached_state(request, *args, **kwargs):
+            # condition() asks for the ETag and Last-Modified separately
+            if not hasattr(request, '_content_state'):
+                request._content_state = get_state(request, *args, **kwargs)
+            return request._content_state
+        
+        def get_etag(request, *args, **kwargs):
+            state = get_cached_state(request, *args, **kwargs)
+            if state is None or _has_messages(request):
+                return None
+            parts = [
+                settings.RELEASE_VERSION,
+                get_language(),
+                *(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in state),
+                str(request.user.pk or ''),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            ]
+            return hashlib.md5(':'.join(parts).encode()).hexdigest()
+        
+        def get_last_modified(request, *args, **kwargs):
+            # The header of logged-in visitors changes without the content
+            if request.user.is_authenticated or _has_messages(request):
+                return None
+            state = get_cached_state(request, *args, **kwargs)
+            return state[0] if state else None
+        
+        conditional_view = condition(etag_func=get_etag, last_modified_func=get_last_modified)(view)
+        
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                # Body depends on the session and CSRF cookies; the language is in the URL
+                patch_vary_headers(response, ('Cookie',))
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_list(model):
+    """conditional_page for a model's list view"""
+    return conditional_page(lambda request, *args, **kwargs: get_list_state(model))
+
+
+def conditional_detail(model):
+    """conditional_page for a model's detail view with a slug argument"""
+    return conditional_page(lambda request, slug, *args, **kwargs: get_detail_state(model, slug))
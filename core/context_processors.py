@@ -0,0 +1,3 @@
+def page_cache(request):
+    """page_cache is only set when core.page_cache renders a cacheable body, see base.html"""
+    return {'page_cache': False}
@@ -0,0 +1,137 @@
+"""
+Direct-to-R2 admin uploads.
+
+Instead of streaming an image through a gunicorn worker, the browser asks
+for a presigned PUT URL (direct_upload_presign), uploads the file straight
+to R2 and then confirms it (direct_upload_confirm), which only checks the
+object with a HEAD request. Both calls take constant worker time whatever
+the file size.
+
+The confirmation returns a signed token. Thumbnail fields submit it in
+place of the file (DirectUploadWidget / DirectUploadImageField); CKEditor
+uses the returned URL (static/js/direct_upload.js).
+"""
+from datetime import datetime
+import posixpath
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.widgets import AdminFileWidget
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from django.utils.html import format_html
+from django.utils.text import get_valid_filename
+
+# Where direct uploads may be stored: CKEditor images and the content thumbnails
+CKEDITOR_TARGET = 'ckeditor'
+FIELD_TARGETS = [
+    'blogs.blog.thumbnail',
+    'education.education.thumbnail',
+    'treatments.treatment.thumbnail',
+]
+ALLOWED_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif']
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+PRESIGN_SALT = 'core.direct_upload.presign'
+CONFIRM_SALT = 'core.direct_upload.confirm'
+# A confirmed upload must be submitted with its form within this many seconds
+CONFIRM_MAX_AGE = 24 * 60 * 60
+
+
+def is_enabled():
+    """Whether admin uploads go straight to R2"""
+    return settings.USE_R2 and getattr(settings, 'R2_DIRECT_UPLOADS', False)
+
+
+def get_upload_name(target, filename):
+    """Storage name of a new direct upload, made unique without asking the storage"""
+    stem, extension = posixpath.splitext(get_valid_filename(posixpath.basename(filename)))
+    filename = f"{stem or 'image'}-{get_random_string(7)}{extension.lower()}"
+    if target == CKEDITOR_TARGET:
+        # Same layout as ckeditor_uploader (CKEDITOR_RESTRICT_BY_DATE)
+        return f"{settings.CKEDITOR_UPLOAD_PATH.rstrip('/')}/{datetime.now():%Y/%m/%d}/{filename}"
+    if target not in FIELD_TARGETS:
+        raise ValueError(f'Unknown upload target: {target}')
+    app_label, model_name, field_name = target.split('.')
+    field = apps.get_model(app_label, model_name)._meta.get_field(field_name)
+    return field.generate_filename(None, filename)
+
+
+def get_cache_control(name):
+    """Cache-Control the storage would set on an upload of this name"""
+    get_object_parameters = getattr(default_storage, 'get_object_parameters', None)
+    if get_object_parameters is None:
+        return None
+    return get_object_parameters(name).get('CacheControl')
+
+
+class DirectUpload(str):
+    """
+    Name of a confirmed direct upload. FileField forms accept it in place of
+    an UploadedFile, and assigning it to a model FileField only sets the name.
+    """
+    
+    @property
+    def name(self):
+        return str(self)
+
+
+class DirectUploadWidget(AdminFileWidget):
+    """Admin file input that uploads to R2 from the browser and submits a confirmation token"""
+    
+    class Media:
+        js = ['js/direct_upload.js']
+    
+    def __init__(self, target, attrs=None):
+        self.target = target
+        super().__init__(attrs)
+    
+    def render(self, name, value, attrs=None, renderer=None):
+        html = super().render(name, value, attrs, renderer)
+        if not is_enabled():
+            return html
+        return html + format_html(
+            '<input type="hidden" name="{}" data-direct-upload="{}" data-target="{}" '
+            'data-presign-url="{}" data-confirm-url="{}">',
+            f'{name}_direct',
+            name,
+            self.target,
+            reverse('direct_upload_presign'),
+            reverse('direct_upload_confirm'),
+        )
+    
+    def value_from_datadict(self, data, files, name):
+        token = data.get(f'{name}_direct')
+        if token:
+            try:
+                return DirectUpload(signing.loads(token, salt=CONFIRM_SALT, max_age=CONFIRM_MAX_AGE))
+            except signing.BadSignature:
+                pass
+        return super().value_from_datadict(data, files, name)
+
+
+class DirectUploadImageField(forms.ImageField):
+    """Image form field that also accepts a confirmed direct upload (already checked by HEAD)"""
+    
+    def to_python(self, data):
+        if isinstance(data, DirectUpload):
+            return data
+        return super().to_python(data)
+
+
+class DirectUploadAdminMixin:
+    """ModelAdmin mixin switching direct_upload_fields to direct R2 uploads"""
+    direct_upload_fields = ['thumbnail']
+    
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name in self.direct_upload_fields:
+            target = f'{db_field.model._meta.label_lower}.{db_field.name}'
+            return db_field.formfield(
+                form_class=DirectUploadImageField,
+                widget=DirectUploadWidget(target),
+                **kwargs,
+            )
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
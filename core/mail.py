@@ -0,0 +1,68 @@
+"""
+Email dispatch helpers.
+
+Emails of one event (e.g. a reservation) are built up front with
+build_html_email and sent together over a single connection with
+send_messages, which sends them one by one so a failed message does not
+discard the others.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+logger = logging.getLogger('core')
+
+
+def build_html_email(subject, html_message, recipient_list, from_email=None):
+    """Build an HTML email, also used as the plain text body like send_mail(html_message=...)"""
+    message = EmailMultiAlternatives(
+        subject,
+        html_message,
+        from_email or settings.DEFAULT_FROM_EMAIL,
+        list(recipient_list),
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def get_html_body(message):
+    """Get the HTML alternative of a message, or an empty string"""
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            return content
+    return ''
+
+
+def send_messages(messages, connection=None):
+    """
+    Send messages over one connection (a new one from get_connection() if
+    not given). Returns an outcome per message in the same order: None if
+    it was sent, otherwise the exception that prevented it.
+    """
+    if not messages:
+        return []
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        opened = connection.open()
+    except Exception as e:
+        logger.error(f"Could not open email connection. Error: {str(e)}", exc_info=True)
+        return [e] * len(messages)
+
+    outcomes = []
+    try:
+        for message in messages:
+            message.connection = connection
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                logger.error(f"Failed to send email '{message.subject}' to {', '.join(message.to)}. Error: {str(e)}", exc_info=True)
+                outcomes.append(e)
+            else:
+                outcomes.append(None)
+    finally:
+        # Only close a connection this call opened, a caller's open one stays usable
+        if opened:
+            connection.close()
+    return outcomes
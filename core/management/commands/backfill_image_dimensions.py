@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from blogs.models import Blog
+from education.models import Education
+from naomi_face_studio import image_variants
+from treatments.models import Treatment
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill thumbnail_width/thumbnail_height of blogs, treatments and education items '
+        'that have none, reading the image headers concurrently'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Images read in parallel (default: 8)')
+        parser.add_argument('--force', action='store_true', help='Also re-read images that already have dimensions')
+
+    def read(self, instance):
+        """Read one thumbnail's dimensions, returns (instance, error message or None)"""
+        try:
+            instance.thumbnail_width, instance.thumbnail_height = image_variants.read_dimensions(instance.thumbnail)
+            return instance, None
+        except Exception as e:
+            return instance, str(e)
+
+    def handle(self, *args, **options):
+        total = 0
+        failed = 0
+        for model in (Blog, Treatment, Education):
+            queryset = model.objects.exclude(thumbnail='').only('pk', 'thumbnail', 'thumbnail_width', 'thumbnail_height')
+            if not options['force']:
+                queryset = queryset.filter(thumbnail_width__isnull=True)
+            instances = list(queryset)
+            if not instances:
+                continue
+            
+            updated = []
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                for instance, error in executor.map(self.read, instances):
+                    if error:
+                        failed += 1
+                        self.stderr.write(f'Could not read {instance.thumbnail.name}: {error}')
+                    else:
+                        updated.append(instance)
+            # Bulk update, so no signals and no save-time processing
+            model.objects.bulk_update(updated, ['thumbnail_width', 'thumbnail_height'], batch_size=500)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {len(updated)} updated')
+            total += len(updated)
+        
+        self.stdout.write(self.style.SUCCESS(f'Stored dimensions of {total} thumbnail(s), {failed} failed'))
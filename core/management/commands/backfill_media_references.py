@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import MediaReference
+
+CONTENT_MODELS = ['blogs.Blog', 'treatments.Treatment', 'education.Education']
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MediaReference rows from the thumbnails and rich text of all blogs, treatments and education items'
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for label in CONTENT_MODELS:
+                model = apps.get_model(label)
+                count = 0
+                for instance in model.objects.iterator():
+                    MediaReference.sync(instance)
+                    count += 1
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {count} synced')
+            # References of objects that no longer exist
+            stale = 0
+            for content_type_id, object_ids in self.get_referenced_objects().items():
+                model = apps.get_model(*content_type_id)
+                existing = set(model.objects.filter(pk__in=object_ids).values_list('pk', flat=True))
+                missing = set(object_ids) - existing
+                if missing:
+                    stale += MediaReference.objects.filter(
+                        content_type__app_label=content_type_id[0],
+                        content_type__model=content_type_id[1],
+                        object_id__in=missing,
+                    ).delete()[0]
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{MediaReference.objects.count()} media references, {stale} stale removed'
+        ))
+    
+    def get_referenced_objects(self):
+        """Map of (app_label, model) -> referenced object ids"""
+        referenced = {}
+        rows = MediaReference.objects.values_list('content_type__app_label', 'content_type__model', 'object_id')
+        for app_label, model_name, object_id in rows:
+            referenced.setdefault((app_label, model_name), []).append(object_id)
+        return referenced
@@ -0,0 +1,127 @@
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import boto3
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from naomi_face_studio import media_ops
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    """Accepts every DeleteObject and DeleteObjects, keeps connections alive like R2"""
+    protocol_version = 'HTTP/1.1'
+    handshake_delay = 0
+    request_count = 0
+    count_lock = threading.Lock()
+    
+    @classmethod
+    def count_request(cls):
+        with cls.count_lock:
+            cls.request_count += 1
+    
+    def setup(self):
+        # Stand-in for the TCP + TLS handshake cost of a new connection
+        time.sleep(self.handshake_delay)
+        super().setup()
+    
+    def do_DELETE(self):
+        self.count_request()
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_POST(self):
+        # DeleteObjects (POST /bucket?delete) in quiet mode: no errors to report
+        self.count_request()
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'<?xml version="1.0" encoding="UTF-8"?><DeleteResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></DeleteResult>'
+        if urlparse(self.path).query != 'delete':
+            self.send_response(400)
+            body = b''
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-delete latency of a fresh boto3 client per call (old behaviour) '
+        'with the shared media_ops client and batched DeleteObjects, against an in-process fake S3 server'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--deletes', type=int, default=200, help='Deletes per run (default: 200)')
+        parser.add_argument('--handshake-ms', type=float, default=20, help='Simulated connection setup time in ms (default: 20)')
+    
+    def handle(self, *args, **options):
+        FakeS3Handler.handshake_delay = options['handshake_ms'] / 1000
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeS3Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        try:
+            with override_settings(
+                USE_R2=True,
+                AWS_S3_ENDPOINT_URL=f'http://127.0.0.1:{server.server_address[1]}',
+                AWS_ACCESS_KEY_ID='benchmark',
+                AWS_SECRET_ACCESS_KEY='benchmark',
+                AWS_STORAGE_BUCKET_NAME='benchmark',
+                AWS_LOCATION='media',
+            ):
+                media_ops.reset_s3_client()
+                keys = [f'uploads/benchmark-{index}.webp' for index in range(options['deletes'])]
+                self.report('Fresh client per delete', *self.run(self.delete_with_fresh_client, keys))
+                self.report('Shared client', *self.run(media_ops.delete_file_from_r2, keys))
+                self.report_batch(keys)
+        finally:
+            media_ops.reset_s3_client()
+            server.shutdown()
+            server.server_close()
+    
+    def delete_with_fresh_client(self, file_path):
+        """The removed per-call implementation, kept here as the baseline"""
+        s3_client = boto3.client(
+            's3',
+            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        )
+        s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=media_ops.get_object_key(file_path))
+    
+    def run(self, delete, keys):
+        FakeS3Handler.request_count = 0
+        latencies = []
+        for key in keys:
+            started = time.perf_counter()
+            delete(key)
+            latencies.append(time.perf_counter() - started)
+        return latencies, FakeS3Handler.request_count
+    
+    def report(self, label, latencies, request_count):
+        latencies = sorted(latencies)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f'{label}: mean {statistics.mean(latencies) * 1000:.2f} ms, '
+            f'p50 {statistics.median(latencies) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms, '
+            f'{request_count} requests'
+        )
+    
+    def report_batch(self, keys):
+        FakeS3Handler.request_count = 0
+        started = time.perf_counter()
+        errors = media_ops.delete_files_from_r2(keys)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Batched DeleteObjects: total {elapsed * 1000:.2f} ms '
+            f'({elapsed / len(keys) * 1000:.3f} ms per file), '
+            f'{FakeS3Handler.request_count} requests, {len(errors)} errors'
+        )
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from naomi_face_studio.site_export import DirectoryTarget, R2Target, SiteExport
+
+
+class Command(BaseCommand):
+    help = (
+        'Render all public pages in every language into static HTML with hashed static '
+        'files, in a directory or under an R2 prefix. Only pages whose content changed '
+        'since the last export (manifest.json) are rendered again, unless --full is given.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--output', help='Directory to export into')
+        target.add_argument('--r2-prefix', help='R2 key prefix to export under, e.g. site')
+        parser.add_argument('--workers', type=int, default=8, help='Pages rendered in parallel (default: 8)')
+        parser.add_argument('--full', action='store_true', help='Render and write every page, ignoring the manifest')
+
+    def handle(self, *args, **options):
+        if options['r2_prefix'] is not None:
+            if not settings.USE_R2:
+                raise CommandError('R2 storage is not enabled (USE_R2=False)')
+            prefix = options['r2_prefix'].strip('/')
+            if not prefix or prefix.split('/')[0] == settings.AWS_LOCATION:
+                raise CommandError(f'The prefix must not be empty or inside the media location ({settings.AWS_LOCATION}/)')
+            target = R2Target(prefix)
+        else:
+            target = DirectoryTarget(options['output'])
+        
+        exported, unchanged, removed, errors = SiteExport(target, options['workers'], options['full']).run()
+        for path, message in errors.items():
+            self.stderr.write(f'Could not export {path}: {message}')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {exported} page(s) to {target}, {unchanged} unchanged, {removed} removed, {len(errors)} failed'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from blogs.models import Blog
+from core import page_cache
+from education.models import Education
+from naomi_face_studio import image_variants
+from treatments.models import Treatment
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive thumbnail variants of blogs, treatments and education items that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that were already generated')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Blog, Treatment, Education):
+            count = 0
+            for instance in model.objects.exclude(thumbnail='').only('pk', 'slug_hr', 'slug_en', 'thumbnail', 'thumbnail_variants').iterator():
+                if options['force']:
+                    # Remove the old files, new ones would otherwise be stored under new names
+                    for name in image_variants.get_variant_names(instance.thumbnail_variants):
+                        instance.thumbnail.storage.delete(name)
+                    model.objects.filter(pk=instance.pk).update(thumbnail_variants={})
+                    instance.thumbnail_variants = {}
+                elif (instance.thumbnail_variants or {}).get('source') == instance.thumbnail.name:
+                    continue
+                image_variants.update_thumbnail_variants(instance)
+                page_cache.invalidate_object(instance)
+                count += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} processed')
+            total += count
+        
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnail variants for {total} object(s)'))
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from core.models import ImageVariantSet, MediaReconcileState, MediaReference
+from naomi_face_studio import media_ops
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete CKEditor uploads in R2 that no blog, treatment or education uses. '
+        'Only objects listed after the stored marker are examined, unless content '
+        'was saved since the last full pass (dirty) or --full is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting them or moving the marker')
+        parser.add_argument('--report', action='store_true', help='List every orphaned and too recent upload')
+        parser.add_argument('--full', action='store_true', help='Examine all uploads, ignoring the stored marker')
+        parser.add_argument('--min-age', type=float, default=24, help='Hours an upload must exist before it can be deleted (default: 24)')
+
+    def handle(self, *args, **options):
+        if not settings.USE_R2:
+            raise CommandError('R2 storage is not enabled (USE_R2=False)')
+
+        started_at = timezone.now()
+        cutoff = started_at - timedelta(hours=options['min_age'])
+        prefix = media_ops.get_upload_prefix()
+        state, _ = MediaReconcileState.objects.get_or_create(prefix=prefix)
+        full_pass = options['full'] or state.dirty
+        start_after = '' if full_pass else state.last_key
+
+        examined = 0
+        candidates = []
+        too_recent = []
+        # The marker only moves past keys that were old enough to decide on,
+        # so a recent upload is examined again on a later run
+        marker = start_after
+        marker_blocked = False
+        for obj in media_ops.iter_objects(prefix, start_after):
+            examined += 1
+            path = media_ops.get_relative_path(obj['Key'])
+            if obj['LastModified'] > cutoff:
+                too_recent.append(path)
+                marker_blocked = True
+                continue
+            candidates.append(path)
+            if not marker_blocked:
+                marker = obj['Key']
+
+        # Rich text image variants belong to their source image and are
+        # orphaned together with it
+        variant_owners = ImageVariantSet.get_owners()
+        owners = {path: variant_owners.get(path, path) for path in candidates}
+        # Set difference against the indexed MediaReference paths
+        used_paths = MediaReference.get_used_paths(set(owners.values()))
+        orphaned = [path for path in candidates if owners[path] not in used_paths]
+
+        if options['report']:
+            for path in orphaned:
+                self.stdout.write(f'orphaned: {path}')
+            for path in too_recent:
+                self.stdout.write(f'too recent: {path}')
+
+        summary = (
+            f'{"Full" if full_pass else "Incremental"} pass examined {examined} upload(s): '
+            f'{len(orphaned)} orphaned, {len(too_recent)} too recent'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{summary} (dry run, nothing deleted)'))
+            return
+
+        errors = media_ops.delete_media_files(orphaned)
+        for path, message in errors.items():
+            self.stderr.write(f'Could not delete {path}: {message}')
+
+        state.last_key = marker
+        state.last_run_at = started_at
+        state.save(update_fields=['last_key', 'last_run_at'])
+        if full_pass:
+            # Keep the flag if content was saved while this pass ran
+            MediaReconcileState.objects.filter(
+                Q(dirty_at__lte=started_at) | Q(dirty_at__isnull=True), pk=state.pk
+            ).update(dirty=False)
+
+        self.stdout.write(self.style.SUCCESS(f'{summary}, {len(orphaned) - len(errors)} deleted'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from blogs.models import Blog
+from core import page_cache
+from core.models import MediaReference
+from education.models import Education
+from naomi_face_studio import rich_text
+from treatments.models import Treatment
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render the stored description HTML of all blogs, treatments and education items, '
+        'e.g. after changing the post-processing or the media domain'
+    )
+
+    def handle(self, *args, **options):
+        rendered_fields = [f'{field}_rendered' for field in rich_text.RICH_TEXT_FIELDS]
+        total = 0
+        for model in (Blog, Treatment, Education):
+            count = 0
+            for instance in model.objects.iterator():
+                rich_text.render_fields(instance)
+                # Queryset update, so no save signals; updated_at is set by hand
+                # so ETags and export fingerprints change with the output
+                model.objects.filter(pk=instance.pk).update(
+                    updated_at=timezone.now(),
+                    **{field: getattr(instance, field) for field in rendered_fields}
+                )
+                MediaReference.sync(instance)
+                page_cache.invalidate_object(instance)
+                count += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} rendered')
+            total += count
+        
+        self.stdout.write(self.style.SUCCESS(f'Rendered descriptions of {total} object(s)'))
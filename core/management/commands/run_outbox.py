@@ -0,0 +1,88 @@
+import logging
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core import mail
+from core.models import EmailOutbox
+from core.signals import outbox_email_sent
+
+logger = logging.getLogger('core')
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the EmailOutbox with retries and exponential backoff'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due emails once and exit')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when nothing is due (default: 5)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per SMTP connection (default: 50)')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before an email is marked failed (default: 5)')
+        parser.add_argument('--backoff', type=float, default=60, help='Base retry delay in seconds, doubled per attempt (default: 60)')
+        parser.add_argument('--lease', type=float, default=600, help='Seconds a claimed batch is hidden from other workers while it is sent (default: 600)')
+    
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_batch(options['batch_size'], options['max_attempts'], options['backoff'], options['lease'])
+            if options['once']:
+                if processed < options['batch_size']:
+                    break
+            elif not processed:
+                time.sleep(options['interval'])
+    
+    def claim_batch(self, batch_size, lease):
+        """
+        Claim due emails by moving their next attempt past the lease, so other
+        workers skip them while they are sent. An email whose worker dies is
+        due again once the lease runs out.
+        """
+        with transaction.atomic():
+            # skip_locked lets several workers claim batches at the same time
+            entries = list(
+                EmailOutbox.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=timezone.now())
+                .order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            if entries:
+                EmailOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+                    next_attempt_at=timezone.now() + timedelta(seconds=lease)
+                )
+        return entries
+    
+    def process_batch(self, batch_size, max_attempts, backoff, lease=600):
+        """Send one batch of due emails over a single SMTP connection, returns the batch size"""
+        entries = self.claim_batch(batch_size, lease)
+        if not entries:
+            return 0
+        
+        # Sent outside any transaction, so no row locks are held during SMTP
+        # One connection per batch, each email succeeds or fails on its own
+        outcomes = mail.send_messages([entry.to_message() for entry in entries])
+        
+        sent = []
+        with transaction.atomic():
+            for entry, error in zip(entries, outcomes):
+                if error is not None:
+                    self.mark_failed_attempt(entry, error, max_attempts, backoff)
+                    continue
+                entry.status = 'sent'
+                entry.attempts += 1
+                entry.sent_at = timezone.now()
+                entry.last_error = ''
+                entry.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+                sent.append(entry)
+                logger.info(f"Outbox email ID: {entry.id} sent to {', '.join(entry.to)}")
+            for entry in sent:
+                outbox_email_sent.send(sender=EmailOutbox, instance=entry)
+        return len(entries)
+    
+    def mark_failed_attempt(self, entry, error, max_attempts, backoff):
+        """Schedule a retry with exponential backoff, or give up after max_attempts"""
+        entry.attempts += 1
+        entry.last_error = str(error)
+        if entry.attempts >= max_attempts:
+            entry.status = 'failed'
+        else:
+            entry.next_attempt_at = timezone.now() + timedelta(seconds=backoff * 2 ** (entry.attempts - 1))
+        entry.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
@@ -0,0 +1,19 @@
+from django.utils.cache import patch_vary_headers
+
+
+class LanguageRedirectVaryMiddleware:
+    """
+    Vary the language redirects of i18n_patterns (e.g. /treatments/ to
+    /hr/treatments/) on Cookie: LocaleMiddleware picks the target from the
+    language cookie but only varies on Accept-Language. Must come before
+    LocaleMiddleware.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code in (301, 302) and response.has_header('Vary') and 'Accept-Language' in response['Vary']:
+            patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaReconcileState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=255, unique=True, verbose_name='Prefix')),
+                ('last_key', models.CharField(blank=True, help_text='Listing resumes after this key', max_length=1024, verbose_name='Last Examined Key')),
+                ('dirty', models.BooleanField(default=True, help_text='Content changed since the last full pass', verbose_name='Dirty')),
+                ('dirty_at', models.DateTimeField(blank=True, null=True, verbose_name='Marked Dirty At')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Last Run')),
+            ],
+            options={
+                'verbose_name': 'Media Reconcile State',
+                'verbose_name_plural': 'Media Reconcile State',
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from naomi_face_studio.media_ops import extract_file_path_from_url, extract_image_urls_from_html
+
+
+CONTENT_MODELS = [('blogs', 'Blog'), ('treatments', 'Treatment'), ('education', 'Education')]
+
+
+def backfill_media_references(apps, schema_editor):
+    """Index the thumbnails and rich text images of existing content"""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    MediaReference = apps.get_model('core', 'MediaReference')
+    references = []
+    for app_label, model_name in CONTENT_MODELS:
+        model = apps.get_model(app_label, model_name)
+        if not model.objects.exists():
+            continue
+        content_type, _ = ContentType.objects.get_or_create(app_label=app_label, model=model_name.lower())
+        for instance in model.objects.iterator():
+            paths = set()
+            if instance.thumbnail:
+                paths.add(('thumbnail', instance.thumbnail.name))
+            for field in ['full_description_hr', 'full_description_en']:
+                for url in extract_image_urls_from_html(getattr(instance, field)):
+                    path = extract_file_path_from_url(url)
+                    if path:
+                        paths.add((field, path))
+            references.extend(
+                MediaReference(path=path, content_type=content_type, object_id=instance.pk, field=field)
+                for field, path in paths
+            )
+    MediaReference.objects.bulk_create(references, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0004_mediareconcilestate'),
+        ('blogs', '0002_blog_meta_description_en_blog_meta_description_hr'),
+        ('education', '0001_initial'),
+        ('treatments', '0002_treatment_pause_hours_treatment_pause_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(db_index=True, max_length=500, verbose_name='Path')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field', models.CharField(max_length=100, verbose_name='Field')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Media Reference',
+                'verbose_name_plural': 'Media References',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mediareference',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'field', 'path'), name='mediareference_unique'),
+        ),
+        migrations.RunPython(backfill_media_references, migrations.RunPython.noop),
+    ]
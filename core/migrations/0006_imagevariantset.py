@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mediareference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariantSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True, verbose_name='Path')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Variants')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image Variant Set',
+                'verbose_name_plural': 'Image Variant Sets',
+            },
+        ),
+    ]
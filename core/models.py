@@ -1,8 +1,14 @@
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from naomi_face_studio import media_ops
+from . import mail
 
 
 class UserProfile(models.Model):
@@ -109,3 +115,227 @@ class EmailCollection(models.Model):
                 user=user,
             )
 
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email queued in the sender's transaction and delivered by the run_outbox worker"""
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('sent', _('Sent')),
+        ('failed', _('Failed')),
+    ]
+    
+    subject = models.CharField(_('Subject'), max_length=255)
+    body = models.TextField(_('Body'))
+    html_body = models.TextField(_('HTML Body'), blank=True)
+    from_email = models.CharField(_('From'), max_length=255)
+    to = models.JSONField(_('To'), default=list)
+    status = models.CharField(_('Status'), max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('Next Attempt'), default=timezone.now)
+    last_error = models.TextField(_('Last Error'), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(_('Sent At'), null=True, blank=True)
+    # Object the email is about, passed to core.signals.outbox_email_sent once delivered
+    content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True)
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    content_object = GenericForeignKey('content_type', 'object_id')
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('Email Outbox')
+        verbose_name_plural = _('Email Outbox')
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+    
+    @staticmethod
+    def enqueue(subject, html_message, recipient_list, from_email=None, content_object=None):
+        """Queue a single HTML email, see enqueue_messages"""
+        return EmailOutbox.enqueue_messages([
+            mail.build_html_email(subject, html_message, recipient_list, from_email),
+        ], content_object)[0]
+    
+    @staticmethod
+    def enqueue_messages(messages, content_object=None):
+        """
+        Queue already built emails in one insert. The rows are written in the
+        caller's transaction, so they are only delivered if it commits.
+        """
+        content_type = ContentType.objects.get_for_model(content_object) if content_object else None
+        return EmailOutbox.objects.bulk_create([
+            EmailOutbox(
+                subject=message.subject,
+                body=message.body,
+                html_body=mail.get_html_body(message),
+                from_email=message.from_email,
+                to=list(message.to),
+                content_type=content_type,
+                object_id=content_object.pk if content_object else None,
+            )
+            for message in messages
+        ])
+    
+    def to_message(self):
+        """Build the email for this outbox entry"""
+        message = EmailMultiAlternatives(self.subject, self.body, self.from_email, self.to)
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+
+class MediaReconcileState(models.Model):
+    """Progress of the reconcile_media job over one R2 upload prefix"""
+    prefix = models.CharField(_('Prefix'), max_length=255, unique=True)
+    last_key = models.CharField(_('Last Examined Key'), max_length=1024, blank=True, help_text=_('Listing resumes after this key'))
+    dirty = models.BooleanField(_('Dirty'), default=True, help_text=_('Content changed since the last full pass'))
+    dirty_at = models.DateTimeField(_('Marked Dirty At'), null=True, blank=True)
+    last_run_at = models.DateTimeField(_('Last Run'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Media Reconcile State')
+        verbose_name_plural = _('Media Reconcile State')
+    
+    def __str__(self):
+        return self.prefix
+    
+    @staticmethod
+    def mark_dirty(prefix):
+        """Request a full pass on the next reconcile_media run (one UPDATE in the common case)"""
+        now = timezone.now()
+        if not MediaReconcileState.objects.filter(prefix=prefix).update(dirty=True, dirty_at=now):
+            MediaReconcileState.objects.get_or_create(prefix=prefix, defaults={'dirty': True, 'dirty_at': now})
+
+
+class MediaReference(models.Model):
+    """
+    A media file path used by a field of a content object (blog, treatment,
+    education). Kept in sync by the content apps' signals, so finding out
+    whether a file is still used is an indexed lookup.
+    """
+    path = models.CharField(_('Path'), max_length=500, db_index=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    field = models.CharField(_('Field'), max_length=100)
+    
+    # Media fields of the content models: file fields and rich text fields
+    FILE_FIELDS = ['thumbnail']
+    HTML_FIELDS = [
+        'full_description_hr', 'full_description_en',
+        # Their srcset variants, see naomi_face_studio.rich_text
+        'full_description_hr_rendered', 'full_description_en_rendered',
+    ]
+    
+    class Meta:
+        verbose_name = _('Media Reference')
+        verbose_name_plural = _('Media References')
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id', 'field', 'path'], name='mediareference_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.path} ({self.content_type.model} {self.object_id}.{self.field})"
+    
+    @staticmethod
+    def get_paths(instance):
+        """Set of (field, path) media references of a content object"""
+        paths = set()
+        for field in MediaReference.FILE_FIELDS:
+            file = getattr(instance, field, None)
+            if file:
+                paths.add((field, file.name))
+        for field in MediaReference.HTML_FIELDS:
+            for url in media_ops.extract_image_urls_from_html(getattr(instance, field, '')):
+                path = media_ops.extract_file_path_from_url(url)
+                if path:
+                    paths.add((field, path))
+        return paths
+    
+    @staticmethod
+    def sync(instance):
+        """Update the references of a saved content object, touching only the rows that changed"""
+        content_type = ContentType.objects.get_for_model(instance)
+        references = MediaReference.objects.filter(content_type=content_type, object_id=instance.pk)
+        current = {(field, path): pk for pk, field, path in references.values_list('pk', 'field', 'path')}
+        wanted = MediaReference.get_paths(instance)
+        
+        removed = [pk for reference, pk in current.items() if reference not in wanted]
+        if removed:
+            MediaReference.objects.filter(pk__in=removed).delete()
+        MediaReference.objects.bulk_create([
+            MediaReference(path=path, content_type=content_type, object_id=instance.pk, field=field)
+            for field, path in wanted if (field, path) not in current
+        ])
+    
+    @staticmethod
+    def clear(instance):
+        """Remove the references of a deleted content object"""
+        MediaReference.objects.filter(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+        ).delete()
+    
+    @staticmethod
+    def is_used(path):
+        """Whether any content object still uses a media file"""
+        return MediaReference.objects.filter(path=path).exists()
+    
+    @staticmethod
+    def get_used_paths(paths, batch_size=500):
+        """The subset of paths that are still used, in indexed batches"""
+        paths = list(paths)
+        used = set()
+        for index in range(0, len(paths), batch_size):
+            used.update(
+                MediaReference.objects.filter(path__in=paths[index:index + batch_size])
+                .values_list('path', flat=True)
+            )
+        return used
+
+
+class ImageVariantSet(models.Model):
+    """
+    Responsive variants of an image embedded in rich text, keyed by its
+    media path (see naomi_face_studio.rich_text). Generated once, when
+    content using the image is first saved, and deleted with the image
+    (see naomi_face_studio.media_ops.delete_media_files).
+    """
+    path = models.CharField(_('Path'), max_length=500, unique=True)
+    data = models.JSONField(_('Variants'), default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Image Variant Set')
+        verbose_name_plural = _('Image Variant Sets')
+    
+    def __str__(self):
+        return self.path
+    
+    @staticmethod
+    def get_variant_names(paths, batch_size=500):
+        """Storage names of the variants of the given source paths, as source path -> names"""
+        # Import here to avoid circular imports
+        from naomi_face_studio.image_variants import get_variant_names
+        
+        paths = list(paths)
+        names = {}
+        for index in range(0, len(paths), batch_size):
+            for path, data in ImageVariantSet.objects.filter(path__in=paths[index:index + batch_size]).values_list('path', 'data'):
+                names[path] = get_variant_names(data)
+        return names
+    
+    @staticmethod
+    def get_owners():
+        """Source path of every recorded variant, as variant name -> source path"""
+        # Import here to avoid circular imports
+        from naomi_face_studio.image_variants import get_variant_names
+        
+        return {
+            name: path
+            for path, data in ImageVariantSet.objects.values_list('path', 'data').iterator()
+            for name in get_variant_names(data)
+        }
@@ -0,0 +1,118 @@
+"""
+Full-page cache for the treatment, blog and education detail pages.
+
+The rendered body of a detail page is cached per release, model,
+language, slug and origin (scheme and host, which the canonical and Open
+Graph URLs are built from). Everything that depends on the visitor (the
+header with the login state and CSRF tokens, and flash messages) is left
+out of the cached body as a marker and rendered for every request, so
+anonymous and logged-in visitors share one cache entry.
+
+Every model/language/slug has a generation in the cache that is part of
+the entry key. The content apps' signals bump it when an object is saved
+or deleted, which drops the entries of all origins at once.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+KEY_PREFIX = 'page'
+ENTRY_TIMEOUT = 60 * 60 * 24
+LANGUAGES = ['hr', 'en']
+
+# Emitted by base.html instead of the per-request fragments when page_cache is set
+HEADER_MARKER = '<!--page-cache:header-->'
+MESSAGES_MARKER = '<!--page-cache:messages-->'
+
+
+def _generation_key(model, language_code, slug):
+    return f'{KEY_PREFIX}:generation:{model._meta.label_lower}:{language_code}:{slug}'
+
+
+def _get_generation(model, language_code, slug):
+    key = _generation_key(model, language_code, slug)
+    generation = cache.get(key)
+    if generation is None:
+        # Time-based so an evicted generation never matches older entries
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _entry_key(request, model, language_code, slug):
+    generation = _get_generation(model, language_code, slug)
+    return (
+        f'{KEY_PREFIX}:{settings.RELEASE_VERSION}:{model._meta.label_lower}:{language_code}:{slug}:'
+        f'{generation}:{request.scheme}://{request.get_host()}'
+    )
+
+
+def render_fragments(request, body):
+    """Fill the per-request fragments into a cached body"""
+    header = render_to_string('includes/header.html', request=request)
+    messages = render_to_string('includes/messages.html', request=request)
+    return body.replace(HEADER_MARKER, header, 1).replace(MESSAGES_MARKER, messages, 1)
+
+
+def cached_detail(request, model, language_code, slug, template_name, get_context):
+    """
+    Respond with the cached detail page of model/language/slug, rendering
+    and caching it with get_context() on a miss. get_context may raise
+    Http404, which is not cached.
+    """
+    key = _entry_key(request, model, language_code, slug)
+    body = cache.get(key)
+    if body is None:
+        context = {**get_context(), 'page_cache': True}
+        body = render_to_string(template_name, context, request=request)
+        cache.set(key, body, ENTRY_TIMEOUT)
+    return HttpResponse(render_fragments(request, body))
+
+
+def _bump_generations(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(model, slugs_by_language):
+    """Drop the cached pages of the given slugs once the current transaction commits"""
+    keys = [
+        _generation_key(model, language_code, slug)
+        for language_code, slug in slugs_by_language.items() if slug
+    ]
+    if keys:
+        # After commit, so a concurrent request cannot cache the old content again
+        transaction.on_commit(lambda: _bump_generations(keys))
+
+
+def get_slugs(instance):
+    """Slugs of a content object by language"""
+    return {language_code: getattr(instance, f'slug_{language_code}', '') for language_code in LANGUAGES}
+
+
+def invalidate_object(instance):
+    """Drop the cached pages of a content object in all languages"""
+    invalidate(type(instance), get_slugs(instance))
+
+
+def invalidate_replaced_slugs(instance):
+    """Before a save: drop the cached pages of slugs the object is about to give up"""
+    if not instance.pk:
+        return
+    old_slugs = type(instance).objects.filter(pk=instance.pk).values(
+        *[f'slug_{language_code}' for language_code in LANGUAGES]
+    ).first()
+    if old_slugs:
+        new_slugs = get_slugs(instance)
+        invalidate(type(instance), {
+            language_code: old_slugs[f'slug_{language_code}']
+            for language_code in LANGUAGES
+            if old_slugs[f'slug_{language_code}'] != new_slugs[language_code]
+        })
@@ -0,0 +1,154 @@
+"""
+Keyset pagination for the treatment, blog and education lists.
+
+Pages are ordered by (created_at, id), newest first, and addressed by the
+last object before them: ?after=<pk>. Every page is read with an indexed
+range query instead of an OFFSET scan, and the previous page is addressed
+the same way, so each page has exactly one URL (the first page is the
+bare list URL). Old ?page=N links are mapped to their cursor once.
+
+The total count of a model's listing is cached and dropped by the content
+apps' signals when an object is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+COUNT_KEY_PREFIX = 'list-count'
+COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def _count_key(model):
+    return f'{COUNT_KEY_PREFIX}:{model._meta.label_lower}'
+
+
+def invalidate_count(model):
+    """Drop the cached listing count of a model once the current transaction commits"""
+    key = _count_key(model)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _after(created_at, pk):
+    """Objects after (older than) the given key"""
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+def _before(created_at, pk):
+    """Objects before (newer than) the given key"""
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator, iterable like a Django Page"""
+    
+    def __init__(self, object_list, paginator, cursor, has_next, previous_cursors):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self._has_next = has_next
+        # pks of the objects before this page, nearest first (at most per_page + 1)
+        self._previous_cursors = previous_cursors
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def __getitem__(self, index):
+        return self.object_list[index]
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return bool(self._previous_cursors)
+    
+    def has_other_pages(self):
+        # From the cached count, so templates can decide without extra queries
+        return self.paginator.count > self.paginator.per_page
+    
+    @property
+    def query(self):
+        """Query string of this page, empty for the first page"""
+        return f'?after={self.cursor}' if self.cursor else ''
+    
+    @property
+    def next_query(self):
+        return f'?after={self.object_list[-1].pk}' if self._has_next else ''
+    
+    @property
+    def previous_query(self):
+        """Query string of the previous page, empty if that is the first page"""
+        per_page = self.paginator.per_page
+        if len(self._previous_cursors) > per_page:
+            return f'?after={self._previous_cursors[per_page]}'
+        return ''
+
+
+class KeysetPaginator:
+    """Paginate a queryset by (created_at, id), newest first"""
+    
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+    
+    @property
+    def count(self):
+        """Number of objects in the listing, cached until an object is saved or deleted"""
+        key = _count_key(self.queryset.model)
+        count = cache.get(key)
+        if count is None:
+            count = self.queryset.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+    
+    @property
+    def num_pages(self):
+        return max(-(-self.count // self.per_page), 1)
+    
+    def get_page(self, cursor=None):
+        """Page after the object with pk cursor, or the first page if the cursor is missing or unknown"""
+        ordered = self.queryset.order_by('-created_at', '-pk')
+        boundary = None
+        if cursor and str(cursor).isdigit():
+            # Any row, so a cursor stays valid when its object is deactivated
+            boundary = self.queryset.model.objects.filter(pk=cursor).values_list('created_at', 'pk').first()
+        if boundary is None:
+            cursor = None
+        else:
+            ordered = ordered.filter(_after(*boundary))
+        
+        objects = list(ordered[:self.per_page + 1])
+        has_next = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        
+        previous_cursors = []
+        if boundary is not None:
+            previous_cursors = list(
+                self.queryset.filter(_before(*boundary) | Q(pk=boundary[1]))
+                .order_by('created_at', 'pk').values_list('pk', flat=True)[:self.per_page + 1]
+            )
+            if not previous_cursors:
+                # Nothing before the boundary (e.g. it was the first object and got deactivated)
+                cursor = None
+        return KeysetPage(objects, self, cursor, has_next, previous_cursors)
+    
+    def get_cursors(self):
+        """Cursors of all pages after the first, in page order (one query over the pks)"""
+        pks = list(self.queryset.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        return [pks[index - 1] for index in range(self.per_page, len(pks), self.per_page)]
+    
+    def get_page_number_query(self, number):
+        """Query string of the page that used to be ?page=number"""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return ''
+        if number <= 1:
+            return ''
+        # One OFFSET read over the pks, only for old links
+        pks = self.queryset.order_by('-created_at', '-pk').values_list('pk', flat=True)
+        offset = (number - 1) * self.per_page - 1
+        cursor = next(iter(pks[offset:offset + 1]), None)
+        return f'?after={cursor}' if cursor else ''
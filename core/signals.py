@@ -1,8 +1,11 @@
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
 from .models import EmailCollection, UserProfile
 
+# Sent by run_outbox after an EmailOutbox entry was delivered, with the entry as instance
+outbox_email_sent = Signal()
+
 
 @receiver(post_save, sender=User)
 def collect_user_email(sender, instance, created, **kwargs):
@@ -0,0 +1,42 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from naomi_face_studio.image_variants import FORMATS
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, variants=None, alt='', sizes='100vw', css_class='', width=None, height=None, loading='lazy'):
+    """
+    Render an image with its generated variants (see naomi_face_studio.image_variants)
+    as a <picture> with one srcset per format, falling back to the original in
+    the <img>. The original is never a <source> candidate, its format differs.
+    width/height (e.g. the thumbnail_width/thumbnail_height columns) reserve
+    the layout space; the original is never opened to find them.
+    """
+    if not image:
+        return ''
+    variants = variants or {}
+    storage = image.storage
+    
+    sources = []
+    for extension, output_format in FORMATS.items():
+        candidates = [variant for variant in variants.get('variants', []) if variant['format'] == extension]
+        if not candidates:
+            continue
+        srcset = ', '.join(f"{storage.url(variant['name'])} {variant['width']}w" for variant in candidates)
+        sources.append((output_format['content_type'], srcset, sizes))
+    
+    width = width or variants.get('width')
+    height = height or variants.get('height')
+    dimensions = format_html(' width="{}" height="{}"', width, height) if width and height else ''
+    
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}"{} loading="{}" decoding="async" class="{}"></picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', sources),
+        image.url,
+        alt,
+        dimensions,
+        loading,
+        css_class,
+    )
@@ -0,0 +1,414 @@
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+from PIL import Image
+
+from blogs.models import Blog
+from blogs.views import LIST_PER_PAGE as BLOGS_PER_PAGE
+from education.models import Education
+from gift_vouchers.models import GiftVoucher
+from gift_vouchers.views import send_gift_voucher_emails
+from naomi_face_studio import image_variants
+from naomi_face_studio.site_export import DirectoryTarget, SiteExport
+from treatments.models import Treatment
+
+from .management.commands.run_outbox import Command as RunOutboxCommand
+from .models import EmailOutbox, ImageVariantSet, MediaReference
+from .pagination import KeysetPaginator, invalidate_count
+from .templatetags.media_tags import responsive_image
+
+
+@override_settings(USE_R2=True, AWS_LOCATION='media')
+class ReconcileMediaTests(TestCase):
+    """reconcile_media keeps variants of used images and deletes those of orphaned ones"""
+    
+    def setUp(self):
+        self.deleted = []
+        patches = [
+            mock.patch('naomi_face_studio.media_ops.iter_objects', side_effect=self.list_objects),
+            mock.patch('naomi_face_studio.media_ops.delete_files_from_r2', side_effect=self.record_delete),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def list_objects(self, prefix, start_after=''):
+        last_modified = timezone.now() - timedelta(days=2)
+        for path in sorted(self.keys):
+            yield {'Key': f'media/{path}', 'LastModified': last_modified}
+    
+    def record_delete(self, file_paths):
+        self.deleted.extend(file_paths)
+        return {}
+    
+    def create_variant_set(self, path):
+        variant = path.replace('/photo', '/variants/photo').replace('.jpg', '-480w.webp')
+        ImageVariantSet.objects.create(path=path, data={
+            'source': path, 'width': 1200, 'height': 800,
+            'variants': [{'name': variant, 'format': 'webp', 'width': 480, 'height': 320}],
+        })
+        return variant
+    
+    def test_variants_follow_their_source(self):
+        used_variant = self.create_variant_set('uploads/a/photo.jpg')
+        orphaned_variant = self.create_variant_set('uploads/b/photo.jpg')
+        # Only the raw description references the source, not the variant
+        MediaReference.objects.create(
+            path='uploads/a/photo.jpg', content_type=ContentType.objects.get_for_model(Blog), object_id=1, field='full_description_hr',
+        )
+        self.keys = ['uploads/a/photo.jpg', used_variant, 'uploads/b/photo.jpg', orphaned_variant]
+        call_command('reconcile_media', '--full', stdout=StringIO())
+        self.assertEqual(sorted(set(self.deleted)), ['uploads/b/photo.jpg', orphaned_variant])
+        self.assertEqual(list(ImageVariantSet.objects.values_list('path', flat=True)), ['uploads/a/photo.jpg'])
+
+
+class RunOutboxTests(TransactionTestCase):
+    """run_outbox sends outside the claiming transaction and reports deliveries"""
+    
+    def setUp(self):
+        self.in_transaction = []
+        self.failures = {}
+        patcher = mock.patch('core.mail.send_messages', side_effect=self.send_messages)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def send_messages(self, messages, **kwargs):
+        self.in_transaction.append(connection.in_atomic_block)
+        return [self.failures.get(message.to[0]) for message in messages]
+    
+    def create_gift_voucher(self, email_option='recipient'):
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            treatment = Treatment.objects.create(
+                title_hr='t', title_en='t', slug_hr='t', slug_en='t-en',
+                short_description_hr='s', short_description_en='s', duration_hours=1, price=10,
+                thumbnail='treatments/thumbnails/t.jpg',
+            )
+        return GiftVoucher.objects.create(
+            treatment=treatment, email_option=email_option, recipient_name='r', from_name='f',
+            purchaser_first_name='p', purchaser_last_name='p', purchaser_email='buyer@example.com',
+            purchaser_mobile='1', recipient_email='friend@example.com',
+        )
+    
+    def test_sends_outside_transaction(self):
+        EmailOutbox.enqueue('Subject', '<p>x</p>', ['a@example.com'])
+        call_command('run_outbox', '--once', stdout=StringIO())
+        self.assertEqual(self.in_transaction, [False])
+        self.assertEqual(EmailOutbox.objects.get().status, 'sent')
+    
+    def test_claimed_entries_skipped_by_other_workers(self):
+        EmailOutbox.enqueue('Subject', '<p>x</p>', ['a@example.com'])
+        command = RunOutboxCommand()
+        self.assertEqual(len(command.claim_batch(10, 600)), 1)
+        self.assertEqual(command.process_batch(10, 5, 60), 0)
+        self.assertEqual(self.in_transaction, [])
+    
+    def test_gift_voucher_marked_sent_after_delivery(self):
+        gift_voucher = self.create_gift_voucher()
+        send_gift_voucher_emails(gift_voucher, 'hr')
+        gift_voucher.refresh_from_db()
+        self.assertFalse(gift_voucher.is_sent)
+        
+        self.failures['friend@example.com'] = Exception('refused')
+        call_command('run_outbox', '--once', stdout=StringIO())
+        gift_voucher.refresh_from_db()
+        self.assertFalse(gift_voucher.is_sent)
+        
+        del self.failures['friend@example.com']
+        EmailOutbox.objects.filter(status='pending').update(next_attempt_at=timezone.now())
+        call_command('run_outbox', '--once', stdout=StringIO())
+        gift_voucher.refresh_from_db()
+        self.assertTrue(gift_voucher.is_sent)
+
+
+class ExportSiteTests(TransactionTestCase):
+    """Keyset list pages are exported as paths a static host can serve"""
+    
+    def setUp(self):
+        cache.clear()
+        # Pages are rendered on worker threads, which need the rows committed
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            self.blogs = [
+                Blog.objects.create(
+                    title_hr=f'{index}', title_en=f'{index}', slug_hr=f'blog-{index}', slug_en=f'blog-{index}-en',
+                    short_description_hr='s', short_description_en='s',
+                    full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+                    thumbnail=f'blogs/thumbnails/{index}.jpg',
+                )
+                for index in range(BLOGS_PER_PAGE + 1)
+            ]
+    
+    def test_list_pages_exported_as_paths(self):
+        # Newest first, so the second page starts after the second oldest blog
+        cursor = self.blogs[1].pk
+        with tempfile.TemporaryDirectory() as root:
+            exported, unchanged, removed, errors = SiteExport(DirectoryTarget(root), workers=1).run()
+            self.assertEqual(errors, {})
+            with open(os.path.join(root, 'hr', 'blogs', 'index.html')) as file:
+                first_page = file.read()
+            self.assertIn(f'/hr/blogs/page/{cursor}/', first_page)
+            self.assertNotIn('?after=', first_page)
+            self.assertTrue(os.path.exists(os.path.join(root, 'hr', 'blogs', 'page', str(cursor), 'index.html')))
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class PageCacheTests(TestCase):
+    """Cached detail pages are kept per origin and release and dropped when their object changes"""
+    
+    def setUp(self):
+        cache.clear()
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            self.blog = Blog.objects.create(
+                title_hr='Prvi naslov', title_en='First title', slug_hr='blog', slug_en='blog-en',
+                short_description_hr='s', short_description_en='s',
+                full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+                thumbnail='blogs/thumbnails/blog.jpg',
+            )
+    
+    def get_page(self, slug='blog', host='www.naomifacestudio.com', secure=True):
+        with translation.override('hr'):
+            url = reverse('blogs:detail', args=[slug])
+        return self.client.get(url, HTTP_HOST=host, secure=secure)
+    
+    def test_cached_per_origin(self):
+        self.get_page(host='naomi.onrender.com', secure=False)
+        response = self.get_page()
+        self.assertContains(response, 'href="https://www.naomifacestudio.com/hr/blogs/blog"')
+        self.assertNotContains(response, 'onrender')
+    
+    def test_cached_per_release(self):
+        self.get_page()
+        Blog.objects.filter(pk=self.blog.pk).update(title_hr='Drugi naslov')
+        self.assertContains(self.get_page(), 'Prvi naslov')
+        with override_settings(RELEASE_VERSION='next'):
+            self.assertContains(self.get_page(), 'Drugi naslov')
+    
+    def save(self, **fields):
+        for name, value in fields.items():
+            setattr(self.blog, name, value)
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.blog.save()
+    
+    def test_invalidated_on_save(self):
+        self.assertContains(self.get_page(), 'Prvi naslov')
+        self.save(title_hr='Drugi naslov')
+        self.assertContains(self.get_page(), 'Drugi naslov')
+    
+    def test_invalidated_on_delete(self):
+        self.assertEqual(self.get_page().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.delete()
+        self.assertEqual(self.get_page().status_code, 404)
+    
+    def test_invalidated_on_deactivation(self):
+        self.assertEqual(self.get_page().status_code, 200)
+        self.save(is_active=False)
+        self.assertEqual(self.get_page().status_code, 404)
+    
+    def test_invalidated_on_slug_change(self):
+        self.assertEqual(self.get_page().status_code, 200)
+        self.save(slug_hr='novi-blog')
+        self.assertEqual(self.get_page().status_code, 404)
+        self.assertContains(self.get_page('novi-blog'), 'Prvi naslov')
+
+
+class ListingQueryTests(TestCase):
+    """List pages read only the card columns, without the rich text fields"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.lists = [('treatments:list', Treatment), ('blogs:list', Blog), ('education:list', Education)]
+        # No image files in tests, variants are not generated
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            for _, model in cls.lists:
+                for index in range(3):
+                    fields = {'price': 10} if model is not Blog else {}
+                    model.objects.create(
+                        title_hr=f'{index}', title_en=f'{index}', slug_hr=f'item-{index}', slug_en=f'item-{index}-en',
+                        short_description_hr='s', short_description_en='s',
+                        full_description_hr='<p>full</p>', full_description_en='<p>full</p>',
+                        thumbnail=f'thumbnails/{index}.jpg', **fields,
+                    )
+    
+    def test_list_leaves_out_rich_text(self):
+        for url_name, model in self.lists:
+            with self.subTest(url_name):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+                table = model._meta.db_table
+                selects = [query['sql'] for query in context.captured_queries if f'FROM "{table}"' in query['sql']]
+                # Conditional GET state, keyset page and count; no per-object loads of deferred fields
+                self.assertLessEqual(len(selects), 3)
+                self.assertTrue(any('"thumbnail_variants"' in sql for sql in selects))
+                for sql in selects:
+                    self.assertNotIn('full_description', sql)
+
+
+class ResponsiveImageTests(TestCase):
+    """Typed <source> srcsets only list renditions in their own format"""
+    
+    def test_original_only_in_img(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = FileSystemStorage(location=root, base_url='/media/')
+            buffer = BytesIO()
+            Image.new('RGB', (800, 400)).save(buffer, format='JPEG')
+            name = storage.save('photo.jpg', ContentFile(buffer.getvalue()))
+            data = image_variants.generate_variants(name, storage, ['webp'])
+            self.assertEqual([variant['width'] for variant in data['variants']], [320, 640, 800])
+            
+            image = FieldFile(None, mock.Mock(storage=storage), name)
+            html = responsive_image(image, data)
+        sources = re.findall(r'<source type="image/webp" srcset="([^"]*)"', html)
+        self.assertEqual(len(sources), 1)
+        self.assertNotIn('photo.jpg', sources[0])
+        self.assertIn('photo-800w.webp 800w', sources[0])
+        self.assertIn('<img src="/media/photo.jpg"', html)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class KeysetPaginationTests(TestCase):
+    """Lists are paged by (created_at, id) cursors, old ?page=N links redirect to them"""
+    
+    def setUp(self):
+        cache.clear()
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            for index in range(13):
+                Blog.objects.create(
+                    title_hr=f'{index}', title_en=f'{index}', slug_hr=f'blog-{index}', slug_en=f'blog-{index}-en',
+                    short_description_hr='s', short_description_en='s',
+                    full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+                    thumbnail=f'blogs/thumbnails/{index}.jpg',
+                )
+        # Newest first
+        self.pks = list(Blog.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.paginator = KeysetPaginator(Blog.objects.filter(is_active=True), 6)
+    
+    def test_pages(self):
+        first = self.paginator.get_page()
+        self.assertEqual([blog.pk for blog in first], self.pks[:6])
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        self.assertEqual(first.query, '')
+        self.assertEqual(first.next_query, f'?after={self.pks[5]}')
+        
+        second = self.paginator.get_page(self.pks[5])
+        self.assertEqual([blog.pk for blog in second], self.pks[6:12])
+        self.assertTrue(second.has_previous())
+        # The previous page is the first one, which has no cursor
+        self.assertEqual(second.previous_query, '')
+        
+        last = self.paginator.get_page(self.pks[11])
+        self.assertEqual([blog.pk for blog in last], self.pks[12:])
+        self.assertFalse(last.has_next())
+        self.assertEqual(last.next_query, '')
+        self.assertEqual(last.previous_query, f'?after={self.pks[5]}')
+        self.assertEqual(self.paginator.num_pages, 3)
+    
+    def test_unknown_cursor_is_first_page(self):
+        page = self.paginator.get_page('999999')
+        self.assertEqual([blog.pk for blog in page], self.pks[:6])
+        self.assertEqual(page.query, '')
+    
+    def test_cursor_survives_deactivation(self):
+        Blog.objects.filter(pk=self.pks[5]).update(is_active=False)
+        page = self.paginator.get_page(self.pks[5])
+        self.assertEqual([blog.pk for blog in page], self.pks[6:12])
+    
+    def test_count_cached_until_invalidated(self):
+        self.assertEqual(self.paginator.count, 13)
+        Blog.objects.filter(pk=self.pks[0]).update(is_active=False)
+        self.assertEqual(self.paginator.count, 13)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_count(Blog)
+        self.assertEqual(self.paginator.count, 12)
+    
+    def test_page_number_redirects(self):
+        with translation.override('hr'):
+            url = reverse('blogs:list')
+        response = self.client.get(f'{url}?page=3')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], f'{url}?after={self.pks[BLOGS_PER_PAGE * 2 - 1]}')
+        response = self.client.get(f'{url}?page=1')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], url)
+    
+    def test_list_links(self):
+        with translation.override('hr'):
+            url = reverse('blogs:list')
+        response = self.client.get(f'{url}?after={self.pks[BLOGS_PER_PAGE - 1]}')
+        self.assertContains(response, f'href="{url}" rel="prev"')
+        self.assertContains(response, f'href="{url}?after={self.pks[BLOGS_PER_PAGE * 2 - 1]}" rel="next"')
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class ConditionalGetTests(TestCase):
+    """Content pages answer a matching If-None-Match with 304 until the content or release changes"""
+    
+    def setUp(self):
+        cache.clear()
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            self.blog = Blog.objects.create(
+                title_hr='Naslov', title_en='Title', slug_hr='blog', slug_en='blog-en',
+                short_description_hr='s', short_description_en='s',
+                full_description_hr='<p>x</p>', full_description_en='<p>x</p>',
+                thumbnail='blogs/thumbnails/b.jpg',
+            )
+        with translation.override('hr'):
+            self.list_url = reverse('blogs:list')
+            self.detail_url = reverse('blogs:detail', args=['blog'])
+    
+    def get_etag(self, url):
+        # The first response sets the CSRF cookie, which is part of the ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        return response['ETag']
+    
+    def test_not_modified(self):
+        for url in (self.list_url, self.detail_url):
+            with self.subTest(url=url):
+                etag = self.get_etag(url)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('private', response['Cache-Control'])
+    
+    def test_modified_after_save(self):
+        etags = {url: self.get_etag(url) for url in (self.list_url, self.detail_url)}
+        self.blog.title_hr = 'Novi naslov'
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.blog.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+    
+    def test_modified_after_release(self):
+        etag = self.get_etag(self.list_url)
+        with override_settings(RELEASE_VERSION='next'):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_missing_detail_has_no_validators(self):
+        with translation.override('hr'):
+            url = reverse('blogs:detail', args=['missing'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
@@ -1,11 +1,19 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.utils.translation import get_language, gettext_lazy as _
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, require_POST
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.core import signing
+from django.core.files.storage import default_storage
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from .models import EmailCollection
+from . import direct_upload
+from naomi_face_studio import media_ops
 from reservations.models import Reservation
 
 
@@ -133,3 +141,73 @@ def logout_view(request):
     messages.success(request, _('You have been logged out successfully.'))
     return redirect('core:home')
 
+
+@staff_member_required
+@require_POST
+def direct_upload_presign(request):
+    """Issue a presigned PUT URL for uploading an admin image straight to R2"""
+    if not direct_upload.is_enabled():
+        return JsonResponse({'error': 'Direct uploads are disabled'}, status=404)
+    
+    target = request.POST.get('target', '')
+    filename = request.POST.get('filename', '')
+    content_type = request.POST.get('content_type', '')
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Missing parameters'}, status=400)
+    if not filename:
+        return JsonResponse({'error': 'Missing parameters'}, status=400)
+    if content_type not in direct_upload.ALLOWED_CONTENT_TYPES:
+        return JsonResponse({'error': 'Unsupported file type'}, status=400)
+    if size > direct_upload.MAX_UPLOAD_SIZE:
+        return JsonResponse({'error': 'File is too large'}, status=400)
+    
+    try:
+        name = direct_upload.get_upload_name(target, filename)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    url, headers = media_ops.generate_presigned_upload(name, content_type, direct_upload.get_cache_control(name))
+    return JsonResponse({
+        'url': url,
+        'headers': headers,
+        'token': signing.dumps(name, salt=direct_upload.PRESIGN_SALT),
+    })
+
+
+@staff_member_required
+@require_POST
+def direct_upload_confirm(request):
+    """Check a direct upload with a HEAD request and return its URL and a confirmation token"""
+    if not direct_upload.is_enabled():
+        return JsonResponse({'error': 'Direct uploads are disabled'}, status=404)
+    
+    try:
+        name = signing.loads(
+            request.POST.get('token', ''),
+            salt=direct_upload.PRESIGN_SALT,
+            max_age=media_ops.PRESIGNED_UPLOAD_EXPIRES * 2,
+        )
+    except signing.BadSignature:
+        return JsonResponse({'error': 'Invalid upload token'}, status=400)
+    
+    metadata = media_ops.head_object(name)
+    if metadata is None:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    if (metadata.get('ContentLength', 0) > direct_upload.MAX_UPLOAD_SIZE
+            or metadata.get('ContentType') not in direct_upload.ALLOWED_CONTENT_TYPES):
+        # The presigned URL cannot limit the size, so reject oversized objects here
+        media_ops.delete_file_from_r2(name)
+        return JsonResponse({'error': 'Upload rejected'}, status=400)
+    
+    return JsonResponse({
+        'name': name,
+        'url': default_storage.url(name),
+        'token': signing.dumps(name, salt=direct_upload.CONFIRM_SALT),
+    })
+
+
+@never_cache
+def csrf_token_view(request):
+    """CSRF token for the forms of statically exported pages (see static_csrf.js)"""
+    return JsonResponse({'token': get_token(request)})
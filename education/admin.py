@@ -4,8 +4,9 @@ from import_export.admin import ImportExportModelAdmin
 from import_export import resources
 from .models import Education
 from django.conf import settings
-import boto3
 import logging
+from naomi_face_studio.media_ops import delete_on_commit
+from core.direct_upload import DirectUploadAdminMixin
 
 logger = logging.getLogger('education')
 
@@ -19,27 +20,8 @@ class EducationResource(resources.ModelResource):
                        'short_description_en', 'price', 'is_active')
 
 
-def delete_media_files_from_r2(file_path):
-    """Delete media files from Cloudflare R2"""
-    if settings.USE_R2 and file_path:
-        try:
-            s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            )
-            key = file_path.lstrip('/')
-            if settings.AWS_LOCATION:
-                key = f"{settings.AWS_LOCATION}/{key}"
-            s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
-            logger.info(f"Successfully deleted media file from R2: {key}")
-        except Exception as e:
-            logger.error(f"Error deleting media file from R2: {file_path}. Error: {str(e)}", exc_info=True)
-
-
 @admin.register(Education)
-class EducationAdmin(ImportExportModelAdmin):
+class EducationAdmin(DirectUploadAdminMixin, ImportExportModelAdmin):
     resource_class = EducationResource
     
     fieldsets = (
@@ -65,19 +47,17 @@ class EducationAdmin(ImportExportModelAdmin):
         if change:
             old_obj = Education.objects.get(pk=obj.pk)
             if old_obj.thumbnail and old_obj.thumbnail != obj.thumbnail:
-                delete_media_files_from_r2(old_obj.thumbnail.name)
+                delete_on_commit([old_obj.thumbnail.name])
         super().save_model(request, obj, form, change)
     
     def delete_model(self, request, obj):
         """Override delete to remove files from R2"""
         if obj.thumbnail:
-            delete_media_files_from_r2(obj.thumbnail.name)
+            delete_on_commit([obj.thumbnail.name])
         super().delete_model(request, obj)
     
     def delete_queryset(self, request, queryset):
         """Override bulk delete to remove files from R2"""
-        for obj in queryset:
-            if obj.thumbnail:
-                delete_media_files_from_r2(obj.thumbnail.name)
+        delete_on_commit([obj.thumbnail.name for obj in queryset if obj.thumbnail])
         super().delete_queryset(request, queryset)
 
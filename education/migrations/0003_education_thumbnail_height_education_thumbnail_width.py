@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0002_education_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='education',
+            name='thumbnail_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Thumbnail Height'),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='thumbnail_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Thumbnail Width'),
+        ),
+    ]
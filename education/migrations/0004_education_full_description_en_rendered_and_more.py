@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('education', '0003_education_thumbnail_height_education_thumbnail_width'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='education',
+            name='full_description_en_rendered',
+            field=models.TextField(blank=True, editable=False, help_text='Post-processed HTML, generated on save', verbose_name='Rendered Full Description (English)'),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='full_description_hr_rendered',
+            field=models.TextField(blank=True, editable=False, help_text='Post-processed HTML, generated on save', verbose_name='Rendered Full Description (Croatian)'),
+        ),
+    ]
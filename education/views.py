@@ -1,17 +1,24 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.translation import get_language
+from core import page_cache
+from core.conditional import conditional_detail, conditional_list
+from core.pagination import KeysetPaginator
 from .models import Education
 
+LIST_PER_PAGE = 6
 
+
+@conditional_list(Education)
 def education_list(request):
     """List all education items with pagination"""
     language_code = get_language()[:2]
-    education_items = Education.objects.filter(is_active=True).order_by('-created_at')
+    education_items = Education.objects.filter(is_active=True).for_listing().order_by('-created_at')
     
-    paginator = Paginator(education_items, 6)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(education_items, LIST_PER_PAGE)
+    if 'page' in request.GET:
+        # Page number links from before keyset pagination
+        return redirect(request.path + paginator.get_page_number_query(request.GET['page']), permanent=True)
+    page_obj = paginator.get_page(request.GET.get('after'))
     
     context = {
         'page_obj': page_obj,
@@ -21,19 +28,22 @@ def education_list(request):
     return render(request, 'education/list.html', context)
 
 
+@conditional_detail(Education)
 def education_detail(request, slug):
     """Individual education detail page"""
     language_code = get_language()[:2]
     
-    if language_code == 'en':
-        education = get_object_or_404(Education, slug_en=slug, is_active=True)
-    else:
-        education = get_object_or_404(Education, slug_hr=slug, is_active=True)
+    def get_context():
+        # Only runs when the page is not cached
+        if language_code == 'en':
+            education = get_object_or_404(Education, slug_en=slug, is_active=True)
+        else:
+            education = get_object_or_404(Education, slug_hr=slug, is_active=True)
+        return {
+            'education': education,
+            'language_code': language_code,
+        }
     
-    context = {
-        'education': education,
-        'language_code': language_code,
-    }
-    return render(request, 'education/detail.html', context)
+    return page_cache.cached_detail(request, Education, language_code, slug, 'education/detail.html', get_context)
 
 
@@ -6,4 +6,7 @@ class GiftVouchersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gift_vouchers'
     verbose_name = _('Gift Vouchers')
+    
+    def ready(self):
+        import gift_vouchers.signals  # noqa
 
@@ -0,0 +1,13 @@
+from django.dispatch import receiver
+from core.signals import outbox_email_sent
+from .models import GiftVoucher
+
+
+@receiver(outbox_email_sent)
+def mark_gift_voucher_sent(sender, instance, **kwargs):
+    """Mark a gift voucher sent once the email to its delivery address went out"""
+    if instance.content_type is None or instance.content_type.model_class() is not GiftVoucher:
+        return
+    gift_voucher = GiftVoucher.objects.filter(pk=instance.object_id).first()
+    if gift_voucher and gift_voucher.get_delivery_email() in instance.to and not gift_voucher.is_sent:
+        GiftVoucher.objects.filter(pk=gift_voucher.pk).update(is_sent=True)
@@ -3,13 +3,14 @@ from django.contrib import messages
 from django.utils.translation import get_language, activate, gettext as _
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from honeypot.decorators import check_honeypot
 from django_ratelimit.decorators import ratelimit
 from .models import GiftVoucher
 from treatments.models import Treatment
-from core.models import EmailCollection
+from core import mail
+from core.models import EmailCollection, EmailOutbox
 import logging
 
 logger = logging.getLogger('gift_vouchers')
@@ -20,7 +21,7 @@ logger = logging.getLogger('gift_vouchers')
 def gift_voucher_form(request):
     """Gift voucher form view"""
     language_code = get_language()[:2]
-    treatments = Treatment.objects.filter(is_active=True)
+    treatments = Treatment.objects.filter(is_active=True).for_listing()
     
     if request.method == 'POST':
         was_limited = getattr(request, 'limited', False)
@@ -57,31 +58,33 @@ def gift_voucher_form(request):
                 'language_code': language_code,
             })
         
-        # Create gift voucher
-        gift_voucher = GiftVoucher.objects.create(
-            treatment=treatment,
-            email_option=email_option,
-            recipient_name=recipient_name,
-            personalised_message=personalised_message,
-            from_name=from_name,
-            purchaser_first_name=purchaser_first_name,
-            purchaser_last_name=purchaser_last_name,
-            purchaser_email=purchaser_email,
-            purchaser_mobile=purchaser_mobile,
-            recipient_email=recipient_email if email_option == 'recipient' else '',
-        )
-        
-        # Collect email (only if not already archived)
-        EmailCollection.collect_email(
-            email=purchaser_email,
-            source='Gift Voucher Form',
-            first_name=purchaser_first_name,
-            last_name=purchaser_last_name,
-            mobile=purchaser_mobile,
-        )
-        
-        # Send emails
-        send_gift_voucher_emails(gift_voucher, language_code)
+        # Save the voucher and queue its emails in one transaction
+        with transaction.atomic():
+            # Create gift voucher
+            gift_voucher = GiftVoucher.objects.create(
+                treatment=treatment,
+                email_option=email_option,
+                recipient_name=recipient_name,
+                personalised_message=personalised_message,
+                from_name=from_name,
+                purchaser_first_name=purchaser_first_name,
+                purchaser_last_name=purchaser_last_name,
+                purchaser_email=purchaser_email,
+                purchaser_mobile=purchaser_mobile,
+                recipient_email=recipient_email if email_option == 'recipient' else '',
+            )
+            
+            # Collect email (only if not already archived)
+            EmailCollection.collect_email(
+                email=purchaser_email,
+                source='Gift Voucher Form',
+                first_name=purchaser_first_name,
+                last_name=purchaser_last_name,
+                mobile=purchaser_mobile,
+            )
+            
+            # Queue emails
+            send_gift_voucher_emails(gift_voucher, language_code)
         
         messages.success(request, _('Gift voucher order submitted successfully!'))
         return redirect('gift_vouchers:form')
@@ -109,49 +112,29 @@ def send_gift_voucher_emails(gift_voucher, language_code='hr'):
             'treatment_title': treatment_title,
         }
         
+        # Render every email first, then queue them together
         # Admin email - translate subject
         admin_subject = _('New Gift Voucher Order - %(name)s') % {'name': gift_voucher.recipient_name}
         admin_message = render_to_string('gift_vouchers/emails/admin_notification.html', context)
-        send_mail(
-            admin_subject,
-            admin_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [settings.ADMIN_EMAIL],
-            html_message=admin_message,
-            fail_silently=False,
-        )
-        logger.info(f"Gift voucher admin notification sent for voucher ID: {gift_voucher.id}")
+        emails = [mail.build_html_email(admin_subject, admin_message, [settings.ADMIN_EMAIL])]
         
         # Purchaser email - translate subject
         purchaser_subject = _('Gift Voucher Order Confirmation - %(treatment)s') % {'treatment': treatment_title}
         purchaser_message = render_to_string('gift_vouchers/emails/purchaser_confirmation.html', context)
-        send_mail(
-            purchaser_subject,
-            purchaser_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [gift_voucher.purchaser_email],
-            html_message=purchaser_message,
-            fail_silently=False,
-        )
-        logger.info(f"Gift voucher confirmation email sent to purchaser: {gift_voucher.purchaser_email} for voucher ID: {gift_voucher.id}")
+        emails.append(mail.build_html_email(purchaser_subject, purchaser_message, [gift_voucher.purchaser_email]))
         
         # Recipient email (if different) - translate subject
         if gift_voucher.email_option == 'recipient' and gift_voucher.recipient_email:
             recipient_subject = _('You received a Gift Voucher! - %(treatment)s') % {'treatment': treatment_title}
             recipient_message = render_to_string('gift_vouchers/emails/recipient_notification.html', context)
-            send_mail(
-                recipient_subject,
-                recipient_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [gift_voucher.recipient_email],
-                html_message=recipient_message,
-                fail_silently=False,
-            )
-            logger.info(f"Gift voucher notification sent to recipient: {gift_voucher.recipient_email} for voucher ID: {gift_voucher.id}")
+            emails.append(mail.build_html_email(recipient_subject, recipient_message, [gift_voucher.recipient_email]))
+        
+        # is_sent is set by the outbox worker once the voucher email is delivered
+        EmailOutbox.enqueue_messages(emails, content_object=gift_voucher)
+        for email in emails:
+            logger.info(f"Gift voucher email queued to {', '.join(email.to)} for voucher ID: {gift_voucher.id}")
         
-        gift_voucher.is_sent = True
-        gift_voucher.save()
-        logger.info(f"Gift voucher emails sent successfully for voucher ID: {gift_voucher.id}")
+        logger.info(f"Gift voucher emails queued successfully for voucher ID: {gift_voucher.id}")
     except Exception as e:
         logger.error(f"Failed to send gift voucher emails for voucher ID: {gift_voucher.id}. Error: {str(e)}", exc_info=True)
         raise
@@ -0,0 +1,152 @@
+"""
+Responsive image variants.
+
+When a thumbnail is saved, WebP renditions (and AVIF when enabled with
+IMAGE_VARIANTS_AVIF and supported by Pillow) are generated at fixed widths
+and stored next to the original through the same storage, e.g.
+treatments/thumbnails/variants/photo-640w.webp. The result is recorded in
+the model's thumbnail_variants field:
+
+    {'source': 'treatments/thumbnails/photo.jpg', 'width': 1600, 'height': 1200,
+     'variants': [{'name': ..., 'format': 'webp', 'width': 640, 'height': 480}, ...]}
+
+The media_tags.responsive_image template tag turns it into srcset/sizes.
+The displayed size of the original is also stored in the thumbnail_width
+and thumbnail_height columns, so templates can emit intrinsic dimensions
+without opening the image.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps, features
+
+from . import media_ops
+
+logger = logging.getLogger('naomi_face_studio')
+
+# Rendition widths in pixels, only those narrower than the original are
+# generated, plus one at the original's width in every format
+VARIANT_WIDTHS = [320, 640, 960, 1280]
+
+# Enough to cover the header (including EXIF) of practically every JPEG, PNG and WebP
+HEADER_BYTES = 64 * 1024
+# EXIF orientations that rotate the image by 90 or 270 degrees
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Pillow save options per output format
+FORMATS = {
+    'avif': {'format': 'AVIF', 'content_type': 'image/avif', 'options': {'quality': 55}},
+    'webp': {'format': 'WEBP', 'content_type': 'image/webp', 'options': {'quality': 80, 'method': 6}},
+}
+
+
+def get_formats():
+    """Output formats to generate, AVIF first since browsers pick the first supported source"""
+    formats = ['webp']
+    if getattr(settings, 'IMAGE_VARIANTS_AVIF', False) and features.check('avif'):
+        formats.insert(0, 'avif')
+    return formats
+
+
+def get_variant_name(name, width, extension):
+    """Storage name of a variant: <dir>/variants/<stem>-<width>w.<extension>"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return f"{directory}/variants/{stem}-{width}w.{extension}" if directory else f"variants/{stem}-{width}w.{extension}"
+
+
+def get_variant_names(variants_data):
+    """Storage names of all recorded variants"""
+    return [variant['name'] for variant in (variants_data or {}).get('variants', [])]
+
+
+def get_display_size(image):
+    """Size of an opened image as shown by browsers, which apply its EXIF orientation"""
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def read_dimensions(field_file):
+    """
+    Displayed (width, height) of a stored image. On R2 only the first
+    HEADER_BYTES are fetched; the whole file is read if the header does
+    not fit.
+    """
+    if settings.USE_R2:
+        try:
+            with Image.open(BytesIO(media_ops.read_object_bytes(field_file.name, HEADER_BYTES))) as image:
+                return get_display_size(image)
+        except (OSError, SyntaxError):
+            pass
+    with field_file.storage.open(field_file.name, 'rb') as source:
+        with Image.open(source) as image:
+            return get_display_size(image)
+
+
+def generate_variants(name, storage, formats=None):
+    """Generate and store the variants of a stored image, returns the data to record"""
+    formats = formats or get_formats()
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+    width, height = image.size
+
+    variants = []
+    # The original's own format cannot be listed in a typed <source>, so the widest candidate is converted too
+    for target_width in [target_width for target_width in VARIANT_WIDTHS if target_width < width] + [width]:
+        target_height = max(round(height * target_width / width), 1)
+        resized = image if target_width == width else image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        for extension in formats:
+            output_format = FORMATS[extension]
+            buffer = BytesIO()
+            resized.save(buffer, format=output_format['format'], **output_format['options'])
+            variant_name = storage.save(get_variant_name(name, target_width, extension), ContentFile(buffer.getvalue()))
+            variants.append({
+                'name': variant_name,
+                'format': extension,
+                'width': target_width,
+                'height': target_height,
+            })
+
+    return {'source': name, 'width': width, 'height': height, 'variants': variants}
+
+
+def update_thumbnail_variants(instance):
+    """
+    Regenerate the thumbnail variants of a saved object if its thumbnail
+    changed. Replaced variant files are deleted by the content apps'
+    pre_save signals together with the old thumbnail.
+    """
+    thumbnail = instance.thumbnail
+    recorded = instance.thumbnail_variants or {}
+    if thumbnail and recorded.get('source') == thumbnail.name:
+        return
+    if not thumbnail:
+        data = {}
+    else:
+        try:
+            data = generate_variants(thumbnail.name, thumbnail.storage)
+        except Exception as e:
+            logger.error(f"Error generating image variants for {thumbnail.name}. Error: {str(e)}", exc_info=True)
+            return
+        logger.info(f"Generated {len(data['variants'])} image variants for {thumbnail.name}")
+    values = {
+        'thumbnail_variants': data,
+        'thumbnail_width': data.get('width'),
+        'thumbnail_height': data.get('height'),
+        # Pages show the variants, so their ETags and export fingerprints have to change
+        'updated_at': timezone.now(),
+    }
+    # Queryset update so post_save is not sent again
+    type(instance).objects.filter(pk=instance.pk).update(**values)
+    for field, value in values.items():
+        setattr(instance, field, value)
@@ -0,0 +1,430 @@
+"""
+Media operations on Cloudflare R2.
+
+All R2 calls outside django-storages go through one boto3 client per
+process. Creating a client reads the configuration, builds an endpoint
+resolver and opens new TLS connections, so it is created lazily on first
+use and then shared by all threads (boto3 clients are thread-safe) with a
+connection pool sized for concurrent deletes.
+
+Bulk deletes use DeleteObjects, up to 1000 keys per request, with the
+requests for large batches running concurrently on a small thread pool.
+
+Deletions requested while saving or deleting content are collected per
+transaction (delete_on_commit) and sent as one deduplicated batch after
+the transaction commits, so a rollback never deletes a file that the
+database still points to.
+
+Direct browser uploads get a presigned PUT URL (R2 does not support
+presigned POST policies) and are checked afterwards with a HEAD request.
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger('naomi_face_studio')
+
+# Connections kept open to the R2 endpoint, shared by all threads
+MAX_POOL_CONNECTIONS = 20
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+DELETE_WORKERS = 4
+# Presigned upload URLs stay valid this long (seconds)
+PRESIGNED_UPLOAD_EXPIRES = 600
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+# Pending deletion batch per database alias, one per open transaction
+_delete_batches = threading.local()
+
+
+def get_s3_client():
+    """Get the shared R2 client of this process, creating it on first use"""
+    global _client, _client_pid
+    # A client inherited through fork() would share sockets with the parent
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = boto3.session.Session().client(
+                    's3',
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=Config(
+                        signature_version='s3v4',
+                        max_pool_connections=MAX_POOL_CONNECTIONS,
+                        connect_timeout=CONNECT_TIMEOUT,
+                        read_timeout=READ_TIMEOUT,
+                        tcp_keepalive=True,
+                        retries={'max_attempts': 3, 'mode': 'standard'},
+                    ),
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def reset_s3_client():
+    """Drop the shared client, e.g. after the R2 settings changed"""
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+def get_object_key(file_path):
+    """Bucket key of a media file path (relative to the media location)"""
+    key = file_path.lstrip('/')
+    if settings.AWS_LOCATION:
+        key = f"{settings.AWS_LOCATION}/{key}"
+    return key
+
+
+def get_relative_path(key):
+    """Media file path of a bucket key, the inverse of get_object_key"""
+    location = settings.AWS_LOCATION
+    if location and key.startswith(f"{location}/"):
+        return key[len(f"{location}/"):]
+    return key
+
+
+def extract_image_urls_from_html(html_content):
+    """Extract image URLs from HTML content, including srcset candidates"""
+    if not html_content:
+        return []
+    urls = re.findall(r'<img\b[^>]*?\ssrc=["\']([^"\']+)["\']', html_content)
+    for srcset in re.findall(r'<img\b[^>]*?\ssrcset=["\']([^"\']+)["\']', html_content):
+        urls.extend(candidate.split()[0] for candidate in srcset.split(',') if candidate.strip())
+    return urls
+
+
+def extract_file_path_from_url(url):
+    """Extract the media file path from an image URL (custom domain, site domain or relative)"""
+    if not url:
+        return None
+    if settings.MEDIA_URL and url.startswith(settings.MEDIA_URL):
+        path = url[len(settings.MEDIA_URL):]
+    elif '/media/' in url:
+        path = url.split('/media/', 1)[1]
+    else:
+        return None
+    return path.split('?')[0] or None
+
+
+def get_upload_prefix():
+    """Bucket key prefix of CKEditor uploads"""
+    return get_object_key(settings.CKEDITOR_UPLOAD_PATH.rstrip('/') + '/')
+
+
+def iter_objects(prefix, start_after=''):
+    """Yield the listed objects under a prefix in key order, starting after start_after"""
+    params = {'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Prefix': prefix}
+    if start_after:
+        params['StartAfter'] = start_after
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(**params):
+        yield from page.get('Contents', [])
+
+
+def generate_presigned_upload(file_path, content_type, cache_control=None):
+    """Presigned PUT URL of a media file path and the headers the upload must send with it"""
+    params = {
+        'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+        'Key': get_object_key(file_path),
+        'ContentType': content_type,
+    }
+    headers = {'Content-Type': content_type}
+    if cache_control:
+        params['CacheControl'] = cache_control
+        headers['Cache-Control'] = cache_control
+    url = get_s3_client().generate_presigned_url(
+        'put_object', Params=params, ExpiresIn=PRESIGNED_UPLOAD_EXPIRES,
+    )
+    return url, headers
+
+
+def head_object(file_path):
+    """Metadata of a media file in R2, or None if it does not exist"""
+    try:
+        return get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=get_object_key(file_path))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+
+def read_object_bytes(file_path, length):
+    """First length bytes of a media file in R2 (one ranged GET)"""
+    response = get_s3_client().get_object(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=get_object_key(file_path),
+        Range=f'bytes=0-{length - 1}',
+    )
+    return response['Body'].read()
+
+
+def delete_file_from_r2(file_path):
+    """Delete a media file from Cloudflare R2, returns whether it was deleted"""
+    if not (settings.USE_R2 and file_path):
+        return False
+    try:
+        key = get_object_key(file_path)
+        get_s3_client().delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        logger.info(f"Successfully deleted file from R2: {key}")
+        return True
+    except Exception as e:
+        logger.error(f"Error deleting file from R2: {file_path}. Error: {str(e)}", exc_info=True)
+        return False
+
+
+def _delete_keys(keys):
+    """Delete up to DELETE_BATCH_SIZE keys in one request, returns key -> error message"""
+    try:
+        response = get_s3_client().delete_objects(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+        )
+    except Exception as e:
+        logger.error(f"Error deleting {len(keys)} files from R2. Error: {str(e)}", exc_info=True)
+        return {key: str(e) for key in keys}
+    # Quiet mode only lists the keys that failed
+    return {
+        error['Key']: f"{error.get('Code', '')}: {error.get('Message', '')}"
+        for error in response.get('Errors', [])
+    }
+
+
+def delete_keys(keys):
+    """
+    Delete bucket keys in DeleteObjects batches, concurrently when there
+    are several. Returns a dict of key -> error message for every key that
+    could not be deleted.
+    """
+    keys = list(keys)
+    batches = [keys[index:index + DELETE_BATCH_SIZE] for index in range(0, len(keys), DELETE_BATCH_SIZE)]
+    if not batches:
+        return {}
+    if len(batches) == 1:
+        results = [_delete_keys(batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(DELETE_WORKERS, len(batches))) as executor:
+            results = list(executor.map(_delete_keys, batches))
+    
+    errors = {}
+    for result in results:
+        errors.update(result)
+    return errors
+
+
+def delete_files_from_r2(file_paths):
+    """
+    Delete many media files from Cloudflare R2 in DeleteObjects batches.
+    Returns a dict of file path -> error message for every file that could
+    not be deleted, empty if all were deleted.
+    """
+    file_paths = list(dict.fromkeys(path for path in file_paths if path))
+    if not (settings.USE_R2 and file_paths):
+        return {}
+    
+    paths_by_key = {get_object_key(path): path for path in file_paths}
+    errors = {paths_by_key.get(key, key): message for key, message in delete_keys(paths_by_key).items()}
+    for file_path, message in errors.items():
+        logger.error(f"Error deleting file from R2: {file_path}. Error: {message}")
+    logger.info(f"Deleted {len(paths_by_key) - len(errors)} of {len(paths_by_key)} files from R2")
+    return errors
+
+
+def delete_media_files(file_paths):
+    """
+    Delete media files from R2 together with the variants of rich text
+    images among them, and drop the ImageVariantSet rows of the images that
+    were deleted. Returns the errors of delete_files_from_r2.
+    """
+    # Import here to avoid circular imports
+    from core.models import ImageVariantSet
+
+    file_paths = list(file_paths)
+    variant_names = ImageVariantSet.get_variant_names(file_paths)
+    errors = delete_files_from_r2(file_paths + [name for names in variant_names.values() for name in names])
+    deleted = [path for path in variant_names if path not in errors]
+    if deleted:
+        ImageVariantSet.objects.filter(path__in=deleted).delete()
+    return errors
+
+
+def put_bucket_object(key, body, content_type, cache_control=None):
+    """Upload bytes to a bucket key (outside the media location, e.g. the static site export)"""
+    params = {
+        'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+        'Key': key,
+        'Body': body,
+        'ContentType': content_type,
+    }
+    if cache_control:
+        params['CacheControl'] = cache_control
+    get_s3_client().put_object(**params)
+
+
+def read_bucket_object(key):
+    """Content of a bucket key, or None if it does not exist"""
+    try:
+        response = get_s3_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return response['Body'].read()
+
+
+class DeleteBatch:
+    """
+    Media files to delete when a transaction commits, as path -> owner path.
+    A file is kept if its owner (itself, or e.g. the thumbnail of a variant)
+    is still referenced once the transaction is over, which also covers
+    work undone by a rolled back savepoint and files shared by several
+    objects.
+    """
+    
+    def __init__(self, using):
+        self.using = using
+        self.paths = {}
+    
+    def add(self, file_paths, owner=None):
+        for path in file_paths:
+            if path:
+                self.paths.setdefault(path, owner or path)
+    
+    def is_registered(self):
+        """Whether flush is still queued on the open transaction (not dropped by a rollback)"""
+        connection = connections[self.using]
+        return connection.in_atomic_block and any(
+            func == self.flush for _, func, _ in connection.run_on_commit
+        )
+    
+    def flush(self):
+        """Delete the collected files that nothing references any more"""
+        batches = getattr(_delete_batches, 'batches', {})
+        if batches.get(self.using) is self:
+            del batches[self.using]
+        if not self.paths:
+            return {}
+        
+        # Import here to avoid circular imports
+        from core.models import MediaReference
+        used_owners = MediaReference.get_used_paths(set(self.paths.values()))
+        file_paths = [path for path, owner in self.paths.items() if owner not in used_owners]
+        kept = len(self.paths) - len(file_paths)
+        if kept:
+            logger.info(f"Kept {kept} queued media files that are still referenced")
+        return delete_media_files(file_paths)
+
+
+def delete_on_commit(file_paths, owner=None, using=None):
+    """
+    Queue media files for deletion from R2 once the current transaction
+    commits (immediately in autocommit mode, so queue only after the
+    MediaReference rows are up to date). Files queued several times in
+    one transaction are deleted once, in a single batch; nothing is deleted
+    if the transaction rolls back.
+    """
+    if not settings.USE_R2:
+        return
+    using = using or DEFAULT_DB_ALIAS
+    batches = getattr(_delete_batches, 'batches', None)
+    if batches is None:
+        batches = _delete_batches.batches = {}
+    
+    batch = batches.get(using)
+    if batch is None or not batch.is_registered():
+        batch = batches[using] = DeleteBatch(using)
+        batch.add(file_paths, owner)
+        # Runs right away outside a transaction
+        transaction.on_commit(batch.flush, using=using)
+    else:
+        batch.add(file_paths, owner)
+
+
+def get_content_file_paths(instance):
+    """Media paths of a content object's thumbnail and description images"""
+    # Import here to avoid circular imports
+    from .rich_text import RICH_TEXT_FIELDS
+
+    file_paths = [instance.thumbnail.name] if instance.thumbnail else []
+    for field in RICH_TEXT_FIELDS:
+        for url in extract_image_urls_from_html(getattr(instance, field, '')):
+            path = extract_file_path_from_url(url)
+            if path:
+                file_paths.append(path)
+    return file_paths
+
+
+def delete_content_files(instance):
+    """pre_delete of a blog, treatment or education item: queue all its media files for deletion"""
+    if not settings.USE_R2:
+        return
+    # Import here to avoid circular imports
+    from .image_variants import get_variant_names
+
+    # Deleted in one batch after commit, unless still referenced by another object
+    delete_on_commit(get_content_file_paths(instance))
+    if instance.thumbnail:
+        delete_on_commit(get_variant_names(instance.thumbnail_variants), owner=instance.thumbnail.name)
+
+
+def delete_replaced_content_files(instance):
+    """
+    pre_save of a blog, treatment or education item: note the files the
+    save replaces. They are queued by sync_content_media once post_save has
+    updated the MediaReference rows; queued here, an autocommit save would
+    flush right away and find them still referenced by the object itself.
+    """
+    instance._replaced_media_files = []
+    if not (settings.USE_R2 and instance.pk):
+        return
+    # Import here to avoid circular imports
+    from .image_variants import get_variant_names
+
+    old_instance = type(instance).objects.filter(pk=instance.pk).first()
+    if old_instance is None:
+        return
+    thumbnail_replaced = bool(old_instance.thumbnail) and old_instance.thumbnail != instance.thumbnail
+    if thumbnail_replaced:
+        # Regenerated in post_save, even if the new upload resolves to the same content-addressed name
+        instance.thumbnail_variants = {}
+
+    # Thumbnail and description images the object no longer uses, as (paths, owner)
+    new_paths = set(get_content_file_paths(instance))
+    instance._replaced_media_files.append(
+        ([path for path in get_content_file_paths(old_instance) if path not in new_paths], None)
+    )
+    if thumbnail_replaced:
+        instance._replaced_media_files.append(
+            (get_variant_names(old_instance.thumbnail_variants), old_instance.thumbnail.name)
+        )
+
+
+def sync_content_media(instance):
+    """
+    post_save of a blog, treatment or education item: update its media
+    references, then queue the files the save replaced for deletion
+    """
+    # Import here to avoid circular imports
+    from core.models import MediaReconcileState, MediaReference
+
+    MediaReference.sync(instance)
+    for file_paths, owner in getattr(instance, '_replaced_media_files', []):
+        delete_on_commit(file_paths, owner=owner)
+    instance._replaced_media_files = []
+    if settings.USE_R2:
+        # The saved object may no longer use some uploads
+        MediaReconcileState.mark_dirty(get_upload_prefix())
@@ -0,0 +1,138 @@
+"""
+Save-time post-processing of CKEditor HTML.
+
+The full descriptions of blogs, treatments and education items are
+rendered once when the object is saved and stored next to the raw HTML
+(full_description_<lang>_rendered), so detail pages print them without
+any parsing. Every <img> gets loading="lazy" and decoding="async"; images
+stored in media are also:
+
+- pointed at the storage URL (the R2 custom domain), whatever host the
+  editor saved,
+- given a WebP srcset from their ImageVariantSet, generated on first use,
+- given width/height when the editor did not size it (attributes or style).
+"""
+import html
+import logging
+import re
+
+from django.core.files.storage import default_storage
+
+from . import image_variants, media_ops
+
+logger = logging.getLogger('naomi_face_studio')
+
+# Raw HTML fields of the content models, rendered into <field>_rendered
+RICH_TEXT_FIELDS = ['full_description_hr', 'full_description_en']
+# Width of the detail pages' text column (max-w-4xl), used for sizes
+CONTENT_WIDTH = 896
+# Variants of embedded images; srcset takes a single format
+FORMATS = ['webp']
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+STYLE_WIDTH_RE = re.compile(r'(?:^|;)\s*width\s*:\s*(\d+)px', re.IGNORECASE)
+STYLE_SIZE_RE = re.compile(r'(?:^|;)\s*(?:width|height)\s*:', re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r'''([^\s"'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+
+
+def parse_attributes(tag):
+    """Attributes of an <img> tag as an ordered dict of lowercase name -> unescaped value"""
+    attributes = {}
+    for match in ATTRIBUTE_RE.finditer(tag[len('<img'):].rstrip('>').rstrip('/')):
+        name = match.group(1).lower()
+        value = next((group for group in match.groups()[1:] if group is not None), '')
+        attributes.setdefault(name, html.unescape(value))
+    return attributes
+
+
+def build_tag(attributes):
+    """<img> tag from an attribute dict"""
+    parts = ''.join(f' {name}="{html.escape(value)}"' for name, value in attributes.items())
+    return f'<img{parts}>'
+
+
+def get_variant_sets(paths):
+    """Variant data of media images by path, generating the missing ones"""
+    # Import here to avoid circular imports
+    from core.models import ImageVariantSet
+
+    paths = set(paths)
+    variant_sets = dict(ImageVariantSet.objects.filter(path__in=paths).values_list('path', 'data'))
+    for path in paths - variant_sets.keys():
+        try:
+            data = image_variants.generate_variants(path, default_storage, FORMATS)
+        except Exception as e:
+            # Not stored, so the next save tries again
+            logger.error(f"Error generating image variants for {path}. Error: {str(e)}", exc_info=True)
+            continue
+        ImageVariantSet.objects.get_or_create(path=path, defaults={'data': data})
+        variant_sets[path] = data
+    return variant_sets
+
+
+def get_fixed_width(attributes):
+    """Pixel width the editor gave the image (width attribute or inline style), or None"""
+    width = attributes.get('width', '')
+    if width.isdigit():
+        return int(width)
+    match = STYLE_WIDTH_RE.search(attributes.get('style', ''))
+    return int(match.group(1)) if match else None
+
+
+def get_sizes(attributes):
+    """sizes attribute: the editor's fixed width, otherwise the text column"""
+    width = get_fixed_width(attributes)
+    if width:
+        return f'(min-width: {width}px) {width}px, 100vw'
+    return f'(min-width: {CONTENT_WIDTH + 32}px) {CONTENT_WIDTH}px, 100vw'
+
+
+def render_image(tag, variant_sets):
+    """Post-process one <img> tag"""
+    attributes = parse_attributes(tag)
+    path = media_ops.extract_file_path_from_url(attributes.get('src', ''))
+    if path:
+        url = default_storage.url(path)
+        attributes['src'] = url
+        data = variant_sets.get(path) or {}
+        variants = [variant for variant in data.get('variants', []) if variant['format'] in FORMATS]
+        if variants and 'srcset' not in attributes:
+            candidates = [f"{default_storage.url(variant['name'])} {variant['width']}w" for variant in variants]
+            if not any(variant['width'] == data['width'] for variant in variants):
+                # Sets generated before full-width variants existed
+                candidates.append(f"{url} {data['width']}w")
+            attributes['srcset'] = ', '.join(candidates)
+            attributes['sizes'] = get_sizes(attributes)
+        sized = 'width' in attributes or 'height' in attributes or STYLE_SIZE_RE.search(attributes.get('style', ''))
+        if data.get('width') and not sized:
+            attributes['width'] = str(data['width'])
+            attributes['height'] = str(data['height'])
+    attributes.setdefault('loading', 'lazy')
+    attributes.setdefault('decoding', 'async')
+    return build_tag(attributes)
+
+
+def render(content, variant_sets=None):
+    """Post-processed copy of a rich text HTML string"""
+    if not content:
+        return ''
+    if variant_sets is None:
+        variant_sets = get_variant_sets(get_media_paths(content))
+    return IMG_TAG_RE.sub(lambda match: render_image(match.group(0), variant_sets), content)
+
+
+def get_media_paths(content):
+    """Media paths of the images in an HTML string"""
+    paths = (media_ops.extract_file_path_from_url(url) for url in media_ops.extract_image_urls_from_html(content))
+    return [path for path in paths if path]
+
+
+def render_fields(instance):
+    """Render all rich text fields of a content object into their _rendered fields"""
+    contents = {field: getattr(instance, field, '') for field in RICH_TEXT_FIELDS}
+    # One variant lookup for all languages
+    variant_sets = get_variant_sets(
+        path for content in contents.values() for path in get_media_paths(content)
+    )
+    for field, content in contents.items():
+        setattr(instance, f'{field}_rendered', render(content, variant_sets))
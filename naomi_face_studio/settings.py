@@ -63,6 +63,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.LanguageRedirectVaryMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +86,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',
+                'core.context_processors.page_cache',
             ],
         },
     },
@@ -189,6 +191,11 @@ if USE_R2:
     AWS_S3_USE_SSL = True
     AWS_S3_VERIFY = True
     
+    # Name uploads by content hash: identical files are stored once and served as immutable
+    R2_CONTENT_ADDRESSED = env.bool('R2_CONTENT_ADDRESSED', default=False)
+    # Admin image uploads go from the browser straight to R2 (needs a CORS rule allowing PUT)
+    R2_DIRECT_UPLOADS = env.bool('R2_DIRECT_UPLOADS', default=False)
+    
     # Use R2 for media files with custom storage class that handles custom domains
     DEFAULT_FILE_STORAGE = 'naomi_face_studio.storage.R2Storage'
     # Keep static files local or use WhiteNoise
@@ -202,6 +209,9 @@ if USE_R2:
 else:
     DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Responsive thumbnail variants (see naomi_face_studio.image_variants)
+IMAGE_VARIANTS_AVIF = env.bool('IMAGE_VARIANTS_AVIF', default=False)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -259,10 +269,13 @@ RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = 'default'
 
 # Cache Configuration
+# The page cache, availability cache and schedule versions are invalidated
+# through this cache, so with more than one process it has to be shared:
+# CACHE_URL=dbcache://django_cache (after manage.py createcachetable) or
+# CACHE_URL=rediscache://host:6379/1. The local-memory default is only
+# correct for a single process.
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
 }
 
 # Session Configuration
@@ -286,6 +299,9 @@ if not DEBUG:
 SITE_URL = env('SITE_URL', default='https://www.naomifacestudio.com')
 SITE_NAME = 'Naomi Face Studio'
 
+# Part of the ETags of content pages, so a deploy invalidates browser copies (set by Render)
+RELEASE_VERSION = env('RENDER_GIT_COMMIT', default='')
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -381,6 +397,11 @@ LOGGING = {
             'level': 'INFO' if not DEBUG else 'DEBUG',
             'propagate': False,
         },
+        'naomi_face_studio': {
+            'handlers': ['console'],
+            'level': 'INFO' if not DEBUG else 'DEBUG',
+            'propagate': False,
+        },
         # Third-party loggers
         'boto3': {
             'handlers': ['console'],
@@ -0,0 +1,271 @@
+"""
+Static export of the public pages (manage.py export_site).
+
+Every public page is rendered in every language through the test client,
+as an anonymous visitor, and written to a directory or an R2 prefix as
+<language>/<path>/index.html so a CDN can serve it:
+
+- CSRF tokens are left empty and static_csrf.js is added, which fills
+  them from /csrf-token/ in the browser, so no copy holds a token,
+- static files the pages reference are copied next to them under
+  content-hashed names (static/images/logo.3f2a9c1b0d4e.webp) and the
+  references rewritten, so CDNs and browsers may cache them forever.
+
+manifest.json at the root records the source fingerprint of every page
+(the updated_at state of the rows it shows, see core.conditional) and the
+hash of its output. A later export only renders pages whose fingerprint
+changed and removes the pages of objects that are gone.
+
+Lists are paginated by keyset (?after=<pk>, see core.pagination). Every
+page of a list is exported as <list>/page/<pk>/index.html and the ?after
+links in the output point there, since a static host ignores the query.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from . import media_ops
+from .storage import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger('naomi_face_studio')
+
+MANIFEST_NAME = 'manifest.json'
+# Pages may change with every export, CDNs revalidate them after a few minutes
+PAGE_CACHE_CONTROL = 'public, max-age=300'
+HASH_LENGTH = 12
+
+CSRF_INPUT_RE = re.compile(r'(<input type="hidden" name="csrfmiddlewaretoken" value=")[^"]*(")')
+# Keyset list URLs, /hr/blogs/?after=12 is exported as /hr/blogs/page/12/
+KEYSET_QUERY_RE = re.compile(r'(/)\?after=(\d+)')
+
+
+def get_pages():
+    """Public pages to export as URL -> source fingerprint"""
+    # Import here to avoid circular imports
+    from blogs.models import Blog
+    from blogs.views import LIST_PER_PAGE as BLOGS_PER_PAGE
+    from core.conditional import get_list_state
+    from core.pagination import KeysetPaginator
+    from education.models import Education
+    from education.views import LIST_PER_PAGE as EDUCATION_PER_PAGE
+    from treatments.models import Treatment
+    from treatments.views import LIST_PER_PAGE as TREATMENTS_PER_PAGE
+
+    def fingerprint(*values):
+        return ':'.join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values)
+
+    models = {'treatments': Treatment, 'blogs': Blog, 'education': Education}
+    per_page = {'treatments': TREATMENTS_PER_PAGE, 'blogs': BLOGS_PER_PAGE, 'education': EDUCATION_PER_PAGE}
+    list_states = {namespace: fingerprint(*get_list_state(model)) for namespace, model in models.items()}
+    list_cursors = {
+        namespace: KeysetPaginator(model.objects.filter(is_active=True), per_page[namespace]).get_cursors()
+        for namespace, model in models.items()
+    }
+    objects = {
+        namespace: list(model.objects.filter(is_active=True).values_list('pk', 'slug_hr', 'slug_en', 'updated_at'))
+        for namespace, model in models.items()
+    }
+
+    pages = {}
+    for language_code, _ in settings.LANGUAGES:
+        with translation.override(language_code):
+            for name in ('core:home', 'core:about_me', 'contacts:form'):
+                pages[reverse(name)] = ''
+            # The voucher form lists the active treatments
+            pages[reverse('gift_vouchers:form')] = list_states['treatments']
+            for namespace in models:
+                list_url = reverse(f'{namespace}:list')
+                pages[list_url] = list_states[namespace]
+                for cursor in list_cursors[namespace]:
+                    pages[f'{list_url}?after={cursor}'] = list_states[namespace]
+                for pk, slug_hr, slug_en, updated_at in objects[namespace]:
+                    slug = slug_en if language_code == 'en' else slug_hr
+                    if slug:
+                        pages[reverse(f'{namespace}:detail', args=[slug])] = fingerprint(pk, updated_at)
+    return {url: f'{settings.RELEASE_VERSION}:{source}' for url, source in pages.items()}
+
+
+def get_page_path(url):
+    """Output path of a page URL: /hr/treatments/?after=12 -> hr/treatments/page/12/index.html"""
+    url = KEYSET_QUERY_RE.sub(r'\1page/\2/', url)
+    return f"{url.strip('/')}/index.html" if url.strip('/') else 'index.html'
+
+
+class DirectoryTarget:
+    """Export into a local directory"""
+    
+    def __init__(self, root):
+        self.root = root
+    
+    def __str__(self):
+        return self.root
+    
+    def read(self, path):
+        try:
+            with open(os.path.join(self.root, path), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+    
+    def write(self, path, data, content_type, cache_control):
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as file:
+            file.write(data)
+    
+    def delete(self, paths):
+        for path in paths:
+            try:
+                os.remove(os.path.join(self.root, path))
+            except FileNotFoundError:
+                pass
+        return {}
+
+
+class R2Target:
+    """Export under a key prefix of the R2 bucket"""
+    
+    def __init__(self, prefix):
+        self.prefix = prefix.strip('/')
+    
+    def __str__(self):
+        return f'r2://{settings.AWS_STORAGE_BUCKET_NAME}/{self.prefix}'
+    
+    def get_key(self, path):
+        return f'{self.prefix}/{path}'
+    
+    def read(self, path):
+        return media_ops.read_bucket_object(self.get_key(path))
+    
+    def write(self, path, data, content_type, cache_control):
+        media_ops.put_bucket_object(self.get_key(path), data, content_type, cache_control)
+    
+    def delete(self, paths):
+        return media_ops.delete_keys(self.get_key(path) for path in paths)
+
+
+class SiteExport:
+    """One export run into a target"""
+    
+    def __init__(self, target, workers=8, full=False):
+        self.target = target
+        self.workers = workers
+        self.full = full
+        site = urlparse(settings.SITE_URL)
+        self.host = site.hostname or 'localhost'
+        self.secure = site.scheme == 'https'
+        self.static_prefix = settings.STATIC_URL
+        self.static_re = re.compile(re.escape(self.static_prefix) + r'([\w\-./]+\.\w+)')
+        self.csrf_script = (
+            f'<script src="{static("js/static_csrf.js")}" '
+            f'data-csrf-url="{reverse("csrf_token")}" defer></script>'
+        )
+        self.clients = threading.local()
+        self.lock = threading.Lock()
+        self.manifest = {'pages': {}, 'assets': {}}
+        self.assets = {}
+    
+    def load_manifest(self):
+        data = self.target.read(MANIFEST_NAME)
+        if data:
+            self.manifest = json.loads(data)
+    
+    def get_client(self):
+        # One client per thread, the test client is not thread-safe
+        if not hasattr(self.clients, 'client'):
+            self.clients.client = Client(SERVER_NAME=self.host)
+        return self.clients.client
+    
+    def get_asset_url(self, match):
+        """Hashed URL of a referenced static file, copying it on first use"""
+        path = match.group(1)
+        with self.lock:
+            if path not in self.assets:
+                self.assets[path] = self.store_asset(path)
+        hashed_path = self.assets[path]
+        return f'{self.static_prefix}{hashed_path}' if hashed_path else match.group(0)
+    
+    def store_asset(self, path):
+        """Copy a static file under its content-hashed name, returns the name or None if not found"""
+        source = finders.find(path)
+        if not source:
+            return None
+        with open(source, 'rb') as file:
+            data = file.read()
+        stem, extension = os.path.splitext(path)
+        hashed_path = f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{extension}'
+        output_path = f"{self.static_prefix.strip('/')}/{hashed_path}"
+        # Hashed names never change content, so an asset written before is kept
+        if self.full or self.manifest['assets'].get(path) != hashed_path:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            self.target.write(output_path, data, content_type, IMMUTABLE_CACHE_CONTROL)
+        return hashed_path
+    
+    def process(self, html):
+        """Post-process a rendered page for static serving"""
+        html = CSRF_INPUT_RE.sub(r'\1\2', html)
+        html = html.replace('</head>', f'{self.csrf_script}\n</head>', 1)
+        html = KEYSET_QUERY_RE.sub(r'\1page/\2/', html)
+        return self.static_re.sub(self.get_asset_url, html)
+    
+    def export_page(self, url):
+        """Render, process and write one page, returns (url, sha256 or None if unchanged, error or None)"""
+        try:
+            response = self.get_client().get(url, secure=self.secure)
+            if response.status_code != 200:
+                return url, None, f'status {response.status_code}'
+            data = self.process(response.content.decode(response.charset)).encode()
+            sha256 = hashlib.sha256(data).hexdigest()
+            if self.full or sha256 != self.manifest['pages'].get(url, {}).get('sha256'):
+                self.target.write(get_page_path(url), data, 'text/html; charset=utf-8', PAGE_CACHE_CONTROL)
+            return url, sha256, None
+        except Exception as e:
+            logger.error(f"Error exporting page {url}. Error: {str(e)}", exc_info=True)
+            return url, None, str(e)
+    
+    def run(self):
+        """Export changed pages and remove stale ones, returns (exported, unchanged, removed, errors)"""
+        self.load_manifest()
+        pages = get_pages()
+        old_pages = self.manifest['pages']
+        changed = [
+            url for url, source in pages.items()
+            if self.full or old_pages.get(url, {}).get('source') != source
+        ]
+        
+        exported = 0
+        errors = {}
+        new_pages = {url: entry for url, entry in old_pages.items() if url in pages}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for url, sha256, error in executor.map(self.export_page, changed):
+                if error:
+                    # Keep the old entry, so the page is tried again next time
+                    errors[url] = error
+                else:
+                    exported += 1
+                    new_pages[url] = {'path': get_page_path(url), 'source': pages[url], 'sha256': sha256}
+        
+        removed = [entry['path'] for url, entry in old_pages.items() if url not in pages]
+        errors.update(self.target.delete(removed))
+        
+        self.manifest = {
+            'exported_at': timezone.now().isoformat(),
+            'release': settings.RELEASE_VERSION,
+            'pages': new_pages,
+            'assets': {**self.manifest['assets'], **{path: name for path, name in self.assets.items() if name}},
+        }
+        self.target.write(MANIFEST_NAME, json.dumps(self.manifest, indent=2).encode(), 'application/json', 'no-cache')
+        return exported, len(pages) - len(changed), len(removed), errors
@@ -1,9 +1,18 @@
 """
 Custom storage backend for Cloudflare R2 with custom domain support.
 """
+import hashlib
+import logging
+import posixpath
+
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
 
+logger = logging.getLogger('naomi_face_studio')
+
+# A content-addressed object never changes, so CDNs and browsers may keep it forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
 
 class R2Storage(S3Boto3Storage):
     """
@@ -13,6 +22,52 @@ class R2Storage(S3Boto3Storage):
     default_acl = 'public-read'
     file_overwrite = False
     
+    @property
+    def content_addressed(self):
+        """
+        Whether uploads are named by the SHA-256 of their content
+        (R2_CONTENT_ADDRESSED), e.g. treatments/thumbnails/<sha256>.jpg.
+        Existing filename-based keys keep working either way.
+        """
+        return getattr(settings, 'R2_CONTENT_ADDRESSED', False)
+    
+    def get_content_name(self, name, content):
+        """Content-addressed name of an upload: same directory and extension, hash as filename"""
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, f'{sha256.hexdigest()}{extension}')
+    
+    def get_available_name(self, name, max_length=None):
+        """Skip the existence check for content-addressed uploads, _save picks the final name"""
+        if self.content_addressed:
+            return name
+        return super().get_available_name(name, max_length)
+    
+    def _save(self, name, content):
+        """Upload a file, or with content addressing reuse an identical object that is already stored"""
+        if not self.content_addressed:
+            return super()._save(name, content)
+        
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            logger.info(f"Reusing identical object in R2: {name}")
+            return name
+        return super()._save(name, content)
+    
+    def get_object_parameters(self, name):
+        """Upload parameters, with a long-lived immutable Cache-Control for content-addressed uploads"""
+        params = super().get_object_parameters(name)
+        if self.content_addressed:
+            params['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        return params
+    
     def url(self, name):
         """
         Generate URL for the file. Uses custom domain if configured.
@@ -8,6 +8,7 @@ from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
 from django.views.i18n import set_language
 from django.utils.translation import gettext_lazy as _
+from core import views as core_views
 
 # Customize admin site header and title
 admin.site.site_header = 'Naomi Face Studio'
@@ -17,7 +18,10 @@ admin.site.index_title = _('Site Administration')
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('ckeditor/', include('ckeditor_uploader.urls')),
+    path('direct-upload/presign/', core_views.direct_upload_presign, name='direct_upload_presign'),
+    path('direct-upload/confirm/', core_views.direct_upload_confirm, name='direct_upload_confirm'),
     path('i18n/setlang/', set_language, name='set_language'),
+    path('csrf-token/', core_views.csrf_token_view, name='csrf_token'),
 ]
 
 urlpatterns += i18n_patterns(
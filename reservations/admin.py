@@ -5,7 +5,8 @@ from django.http import JsonResponse
 from django.utils.html import format_html
 from django.utils import timezone
 from datetime import datetime, date
-from .models import Reservation
+from .models import Reservation, WorkingSchedule, ScheduleException
+from . import availability_cache
 
 
 @admin.register(Reservation)
@@ -60,6 +61,7 @@ class ReservationAdmin(admin.ModelAdmin):
             path('calendar/', self.admin_site.admin_view(self.calendar_view), name='reservations_reservation_calendar'),
             path('calendar/day-reservations/', self.admin_site.admin_view(self.get_day_reservations), name='reservations_day_reservations'),
             path('calendar/month-reservations/', self.admin_site.admin_view(self.get_month_reservations), name='reservations_month_reservations'),
+            path('availability-cache-stats/', self.admin_site.admin_view(self.get_availability_cache_stats), name='reservations_availability_cache_stats'),
         ]
         return custom_urls + urls
     
@@ -125,9 +127,33 @@ class ReservationAdmin(admin.ModelAdmin):
         reservations = Reservation.objects.filter(
             date__gte=start_date,
             date__lte=end_date
-        ).values_list('date', flat=True).distinct()
+        ).values_list('date', flat=True).order_by('date').distinct()
         
         dates_with_reservations = [date.isoformat() for date in reservations]
         
         return JsonResponse({'dates': dates_with_reservations})
+    
+    def get_availability_cache_stats(self, request):
+        """API endpoint to get hit/miss counters of the availability cache"""
+        return JsonResponse(availability_cache.get_cache_stats())
+
+
+@admin.register(WorkingSchedule)
+class WorkingScheduleAdmin(admin.ModelAdmin):
+    list_display = ['day_of_week', 'is_open', 'open_time', 'close_time']
+    list_editable = ['is_open', 'open_time', 'close_time']
+    ordering = ['day_of_week']
+    
+    def has_add_permission(self, request):
+        # One row per weekday, seeded by migration
+        return WorkingSchedule.objects.count() < len(WorkingSchedule.DAY_CHOICES)
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ['start_date', 'end_date', 'is_open', 'open_time', 'close_time', 'reason']
+    search_fields = ['reason']
+    date_hierarchy = 'start_date'
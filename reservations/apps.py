@@ -6,4 +6,6 @@ class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservations'
     verbose_name = _('Reservations')
-
+    
+    def ready(self):
+        import reservations.signals  # noqa
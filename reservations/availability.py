@@ -0,0 +1,259 @@
+"""
+Availability engine for reservations.
+
+Booked time (reservation start to its stored blocked_until, i.e. the end
+plus the treatment pause) is kept per day in a DayOccupancy bitmap with one bit per 15-minute slot.
+Checking a slot is a bitwise test of the slots it touches, so availability
+never loads reservation rows. All times are handled as minutes since
+midnight.
+
+A new booking needs its own pause to be free as well, matching the
+PostgreSQL exclusion constraint on the blocked range.
+"""
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from . import availability_cache, schedule
+from .models import Reservation, DayOccupancy
+
+SLOT_INTERVAL_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_INTERVAL_MINUTES
+ACTIVE_STATUSES = Reservation.ACTIVE_STATUSES
+# Slots for today are only offered from now + this buffer
+SAME_DAY_BUFFER_MINUTES = 60
+# Longest date range accepted by the range availability API
+MAX_RANGE_DAYS = 62
+
+DAY_CLOSED = 'closed'
+DAY_PAST = 'past'
+DAY_FULLY_BOOKED = 'fully_booked'
+DAY_AVAILABLE = 'available'
+
+
+def to_minutes(value):
+    """Convert a time object to minutes since midnight"""
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    """Convert minutes since midnight to a time object"""
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals):
+    """Merge (start, end) intervals into a sorted list of disjoint intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def _active_reservations():
+    return Reservation.objects.filter(status__in=ACTIVE_STATUSES)
+
+
+def _interval_rows(reservations):
+    """Fetch busy interval rows (start to blocked_until) from a queryset"""
+    # Unordered, callers merge the intervals anyway
+    return reservations.order_by().values_list('date', 'start_time', 'blocked_until')
+
+
+def get_busy_intervals(date, exclude_reservation=None):
+    """
+    Load the merged busy intervals for a date in a single query.
+    Each interval runs from the reservation start to its end plus the
+    treatment pause (blocked_until).
+    """
+    reservations = _active_reservations().filter(date=date)
+    if exclude_reservation is not None and exclude_reservation.pk:
+        reservations = reservations.exclude(pk=exclude_reservation.pk)
+
+    intervals = [
+        (to_minutes(start), to_minutes(blocked_until))
+        for _, start, blocked_until in _interval_rows(reservations)
+    ]
+    return merge_intervals(intervals)
+
+
+def get_busy_intervals_for_range(start_date, end_date):
+    """Load merged busy intervals for every date in a range with a single query"""
+    reservations = _active_reservations().filter(date__gte=start_date, date__lte=end_date)
+
+    intervals_by_date = {}
+    for day, start, blocked_until in _interval_rows(reservations):
+        intervals_by_date.setdefault(day, []).append((to_minutes(start), to_minutes(blocked_until)))
+    return {day: merge_intervals(intervals) for day, intervals in intervals_by_date.items()}
+
+
+def interval_bits(start, end):
+    """Bitmask of the 15-minute slots touched by [start, end)"""
+    first_slot = max(start // SLOT_INTERVAL_MINUTES, 0)
+    last_slot = min(-(-end // SLOT_INTERVAL_MINUTES), SLOTS_PER_DAY)
+    if last_slot <= first_slot:
+        return 0
+    return ((1 << (last_slot - first_slot)) - 1) << first_slot
+
+
+def build_occupancy_mask(busy_intervals):
+    """Build a day occupancy bitmask from busy intervals"""
+    mask = 0
+    for start, end in busy_intervals:
+        mask |= interval_bits(start, end)
+    return mask
+
+
+def rebuild_day_occupancy(date):
+    """Recompute and store the occupancy bitmap of a date from its reservations"""
+    mask = build_occupancy_mask(get_busy_intervals(date))
+    DayOccupancy.objects.update_or_create(date=date, defaults={'bitmap': DayOccupancy.format_mask(mask)})
+    return mask
+
+
+def get_occupancy_masks(dates):
+    """Load the occupancy bitmasks for several dates in one query (0 for dates without a row)"""
+    masks = dict.fromkeys(dates, 0)
+    for day, bitmap in DayOccupancy.objects.filter(date__in=masks).values_list('date', 'bitmap'):
+        masks[day] = DayOccupancy.parse_mask(bitmap)
+    return masks
+
+
+def get_earliest_start(date, now=None):
+    """
+    Earliest bookable minute for a date: None for future dates, now plus
+    the same-day buffer for today (in the Croatia timezone).
+    """
+    now_croatia = timezone.localtime(now or timezone.now())
+    if date != now_croatia.date():
+        return None
+    earliest = now_croatia.replace(second=0, microsecond=0) + timedelta(minutes=SAME_DAY_BUFFER_MINUTES)
+    if earliest.date() != date:
+        # Buffer runs past midnight, nothing left today
+        return 24 * 60
+    return earliest.hour * 60 + earliest.minute
+
+
+def get_first_slot_start(working_hours, earliest_start=None):
+    """First slot on the working day grid at or after earliest_start"""
+    open_minute = to_minutes(working_hours[0])
+    if earliest_start is None or earliest_start <= open_minute:
+        return open_minute
+    # Round up to the next slot on the grid
+    offset = earliest_start - open_minute
+    return open_minute + -(-offset // SLOT_INTERVAL_MINUTES) * SLOT_INTERVAL_MINUTES
+
+
+def compute_free_slots(working_hours, occupancy_mask, duration_minutes, pause_minutes=0, earliest_start=None):
+    """
+    Scan the slot grid of a working day against its occupancy bitmask and
+    return the free slot start minutes. The treatment must end by closing
+    time, its pause may run past it.
+    """
+    close_minute = to_minutes(working_hours[1])
+    slot_start = get_first_slot_start(working_hours, earliest_start)
+
+    free_slots = []
+    while slot_start + duration_minutes <= close_minute:
+        if not occupancy_mask & interval_bits(slot_start, slot_start + duration_minutes + pause_minutes):
+            free_slots.append(slot_start)
+        slot_start += SLOT_INTERVAL_MINUTES
+    return free_slots
+
+
+def get_day_free_slots(date, working_hours, duration_minutes, pause_minutes):
+    """Get the free slot starts of a whole working day, through the availability cache"""
+    return availability_cache.get_free_slots(
+        date,
+        working_hours,
+        (duration_minutes, pause_minutes),
+        lambda: compute_free_slots(working_hours, get_occupancy_masks([date])[date], duration_minutes, pause_minutes),
+    )
+
+
+def get_available_slots(date, treatment, now=None):
+    """
+    Get available slots for a treatment on a date as (start, end) time pairs.
+    Returns None if the day is closed.
+    """
+    working_hours = schedule.get_working_hours(date)
+    if not working_hours:
+        return None
+
+    duration_minutes = treatment.get_total_minutes()
+    first_start = get_first_slot_start(working_hours, get_earliest_start(date, now))
+    free_slots = get_day_free_slots(date, working_hours, duration_minutes, treatment.get_total_pause_minutes())
+    return [
+        (to_time(start), to_time(start + duration_minutes))
+        for start in free_slots
+        if start >= first_start
+    ]
+
+
+def get_range_availability(start_date, end_date, treatment, now=None):
+    """
+    Get per-day availability for a treatment over a date range.
+    Returns a dict mapping each date to (state, free_slot_count) where state
+    is one of DAY_CLOSED, DAY_PAST, DAY_FULLY_BOOKED or DAY_AVAILABLE.
+    """
+    now = now or timezone.now()
+    today = timezone.localtime(now).date()
+    duration_minutes = treatment.get_total_minutes()
+    pause_minutes = treatment.get_total_pause_minutes()
+
+    # Resolve every day's hours from one compiled schedule, closed days
+    # never reach the cache or the database
+    compiled_schedule = schedule.get_schedule()
+    days = {}
+    working_days = {}
+    day = start_date
+    while day <= end_date:
+        working_hours = compiled_schedule.get_working_hours(day)
+        if day < today:
+            days[day] = (DAY_PAST, 0)
+        elif not working_hours:
+            days[day] = (DAY_CLOSED, 0)
+        else:
+            working_days[day] = working_hours
+        day += timedelta(days=1)
+
+    def compute_missing(missing_days):
+        # One occupancy query covering every day that missed the cache
+        masks = get_occupancy_masks(missing_days)
+        return {
+            missing_day: compute_free_slots(working_days[missing_day], masks[missing_day], duration_minutes, pause_minutes)
+            for missing_day in missing_days
+        }
+
+    if working_days:
+        free_slots_by_date = availability_cache.get_free_slots_for_dates(
+            working_days, (duration_minutes, pause_minutes), compute_missing
+        )
+        for day, working_hours in working_days.items():
+            first_start = get_first_slot_start(working_hours, get_earliest_start(day, now))
+            free_count = sum(1 for start in free_slots_by_date[day] if start >= first_start)
+            days[day] = (DAY_AVAILABLE if free_count else DAY_FULLY_BOOKED, free_count)
+
+    return dict(sorted(days.items()))
+
+
+def is_slot_available(date, start_time, treatment, exclude_reservation=None):
+    """Check if a time slot is available for a treatment"""
+    working_hours = schedule.get_working_hours(date)
+    if not working_hours:
+        return False
+
+    start = to_minutes(start_time)
+    end = start + treatment.get_total_minutes()
+    if start < to_minutes(working_hours[0]) or end > to_minutes(working_hours[1]):
+        return False
+
+    if exclude_reservation is not None and exclude_reservation.pk:
+        # The stored bitmap includes the reservation being edited, rebuild it without
+        occupancy_mask = build_occupancy_mask(get_busy_intervals(date, exclude_reservation))
+    else:
+        occupancy_mask = get_occupancy_masks([date])[date]
+    return not occupancy_mask & interval_bits(start, end + treatment.get_total_pause_minutes())
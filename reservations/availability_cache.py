@@ -0,0 +1,126 @@
+"""
+Cache layer in front of the availability engine.
+
+Free slot lists are cached per date, working hours and treatment timing
+(total duration and pause minutes), so an edited treatment or changed
+hours in the working schedule simply use new keys. Every date
+has a version counter that is bumped whenever something affecting that day
+changes (see reservations.signals), and the version is part of the entry
+key, so a bump makes all entries for the date unreachable at once.
+
+Bumps are only seen by processes that share the cache (CACHE_URL); with
+the local-memory default, other processes keep serving their own entries
+for up to ENTRY_TIMEOUT, so run a single process.
+"""
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'availability'
+ENTRY_TIMEOUT = 60 * 60 * 24
+HITS_KEY = f'{KEY_PREFIX}:stats:hits'
+MISSES_KEY = f'{KEY_PREFIX}:stats:misses'
+
+
+def _version_key(day):
+    return f'{KEY_PREFIX}:version:{day.isoformat()}'
+
+
+def _entry_key(day, version, working_hours, timing):
+    open_time, close_time = working_hours
+    duration_minutes, pause_minutes = timing
+    return (
+        f'{KEY_PREFIX}:slots:{day.isoformat()}:{version}:'
+        f'{open_time:%H%M}-{close_time:%H%M}:{duration_minutes}:{pause_minutes}'
+    )
+
+
+def _new_version():
+    # Time-based so a version evicted from the cache never restarts at a
+    # value that older entries were stored under
+    return time.time_ns()
+
+
+def _get_versions(days):
+    """Get the current version for each date, initialising missing ones"""
+    keys = {_version_key(day): day for day in days}
+    versions = cache.get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        # add() keeps a version another process initialised in the meantime
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(list(missing)))
+    return {day: versions.get(key) for key, day in keys.items()}
+
+
+def _count(key, amount):
+    if amount:
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Counter evicted between add() and incr()
+            cache.set(key, amount, timeout=None)
+
+
+def invalidate_dates(days):
+    """Bump the version of each date so lookups stop using its cached entries"""
+    for day in set(days):
+        key = _version_key(day)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+
+
+def get_free_slots(day, working_hours, timing, compute):
+    """Get the cached free slot starts for a working day, calling compute() on a miss"""
+    return get_free_slots_for_dates({day: working_hours}, timing, lambda days: {day: compute()})[day]
+
+
+def get_free_slots_for_dates(working_days, timing, compute_missing):
+    """
+    Get cached free slot starts for several working days (a dict of
+    date -> working hours) and a treatment timing (duration_minutes,
+    pause_minutes). compute_missing(dates) is called once with all dates
+    that missed and must return a dict of date -> free slot starts.
+    """
+    days = list(working_days)
+    versions = _get_versions(days)
+    keys = {day: _entry_key(day, versions[day], working_days[day], timing) for day in days}
+    cached = cache.get_many(list(keys.values()))
+
+    result = {}
+    missing = []
+    for day, key in keys.items():
+        if key in cached:
+            result[day] = cached[key]
+        else:
+            missing.append(day)
+
+    if missing:
+        computed = compute_missing(missing)
+        cache.set_many({keys[day]: computed[day] for day in missing}, timeout=ENTRY_TIMEOUT)
+        result.update(computed)
+
+    _count(HITS_KEY, len(days) - len(missing))
+    _count(MISSES_KEY, len(missing))
+    return result
+
+
+def get_cache_stats():
+    """Get hit/miss counters of the availability cache"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats():
+    """Reset hit/miss counters of the availability cache"""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,50 @@
+"""
+Creating reservations safely under concurrent requests.
+
+Bookings for the same date are serialized by locking that date's
+DayOccupancy row (select_for_update) for the rest of the transaction, so
+concurrent requests for other days never wait on each other. SQLite ignores
+select_for_update; there an UPDATE of the row takes the database write lock
+instead. The PostgreSQL exclusion constraint (reservation_no_overlap) stays
+as a backstop for writes that bypass this module.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Reservation, DayOccupancy
+
+
+class SlotUnavailable(Exception):
+    """The requested time slot is closed or overlaps another reservation"""
+
+
+def lock_day(date):
+    """Lock the DayOccupancy row of a date until the current transaction ends"""
+    if connection.vendor == 'sqlite':
+        # Start the write transaction with an UPDATE so SQLite takes its
+        # write lock before the availability check instead of at the INSERT
+        locked = DayOccupancy.objects.filter(date=date).update(updated_at=timezone.now())
+        if not locked:
+            DayOccupancy.objects.create(date=date)
+        return
+    DayOccupancy.objects.get_or_create(date=date)
+    DayOccupancy.objects.select_for_update().get(date=date)
+
+
+def create_reservation(user, treatment, date, start_time, notes=''):
+    """Create a reservation or raise SlotUnavailable"""
+    try:
+        with transaction.atomic():
+            lock_day(date)
+            if not Reservation.is_available(date, start_time, treatment):
+                raise SlotUnavailable()
+            return Reservation.objects.create(
+                user=user,
+                treatment=treatment,
+                date=date,
+                start_time=start_time,
+                notes=notes,
+            )
+    except IntegrityError:
+        # Exclusion constraint or unique active start violated
+        raise SlotUnavailable()
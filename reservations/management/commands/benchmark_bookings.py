@@ -0,0 +1,120 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from reservations import availability
+from reservations.models import Reservation
+from treatments.models import Treatment
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent create_reservation requests for one day through the Django test client '
+        'and report throughput, p95 latency and double bookings. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Number of booking requests (default: 100)')
+        parser.add_argument('--threads', type=int, default=10, help='Number of concurrent threads (default: 10)')
+        parser.add_argument('--slots', type=int, default=4, help='Number of distinct start times competed for (default: 4)')
+
+    def handle(self, *args, **options):
+        test_db_file = None
+        if connection.vendor == 'sqlite':
+            # Threads need a file database; the in-memory test database uses table locks that fail instead of waiting
+            test_db_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+            connections.databases['default'].setdefault('TEST', {})['NAME'] = test_db_file
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                self.run_benchmark(options['requests'], options['threads'], options['slots'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            if test_db_file and os.path.exists(test_db_file):
+                os.remove(test_db_file)
+
+    def run_benchmark(self, request_count, thread_count, slot_count):
+        treatment = Treatment.objects.create(
+            title_hr='Benchmark', title_en='Benchmark', slug_hr='benchmark', slug_en='benchmark-en',
+            short_description_hr='-', short_description_en='-', full_description_hr='-', full_description_en='-',
+            duration_minutes=45, pause_minutes=15, price=0, thumbnail='benchmark.webp',
+        )
+        users = [
+            User.objects.create_user(username=f'benchmark{index}', email=f'benchmark{index}@example.com')
+            for index in range(request_count)
+        ]
+
+        # Next Tuesday, a full working day
+        booking_date = date.today() + timedelta(days=7)
+        booking_date += timedelta(days=(1 - booking_date.weekday()) % 7)
+        start_times = [f'{hour:02d}:{minute:02d}' for hour in range(9, 17) for minute in (0, 15, 30, 45)][:slot_count]
+
+        latencies = []
+        statuses = {}
+        lock = threading.Lock()
+
+        def book(user):
+            client = Client()
+            client.force_login(user)
+            payload = json.dumps({
+                'treatment_id': treatment.id,
+                'date': booking_date.isoformat(),
+                'start_time': random.choice(start_times),
+            })
+            started = time.perf_counter()
+            try:
+                response = client.post('/hr/reservations/api/create/', payload, content_type='application/json')
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            list(executor.map(book, users))
+        total_time = time.perf_counter() - started
+
+        latencies.sort()
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+
+        self.stdout.write(f'Requests: {request_count} on {thread_count} threads for {len(start_times)} start times')
+        self.stdout.write(f'Throughput: {request_count / total_time:.1f} requests/s')
+        self.stdout.write(f'Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, p95: {p95 * 1000:.1f} ms')
+        self.stdout.write(f'Responses: {", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str))}')
+
+        double_bookings = self.count_double_bookings(booking_date)
+        style = self.style.SUCCESS if double_bookings == 0 else self.style.ERROR
+        self.stdout.write(style(f'Double bookings: {double_bookings}'))
+
+    def count_double_bookings(self, booking_date):
+        """Count pairs of active reservations whose blocked ranges overlap"""
+        intervals = sorted(
+            (availability.to_minutes(start), availability.to_minutes(blocked_until))
+            for start, blocked_until in Reservation.objects.filter(
+                date=booking_date,
+                status__in=Reservation.ACTIVE_STATUSES,
+            ).values_list('start_time', 'blocked_until')
+        )
+        return sum(
+            1
+            for index, (start, end) in enumerate(intervals)
+            for other_start, other_end in intervals[index + 1:]
+            if other_start < end
+        )
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from reservations import availability
+from reservations.models import Reservation
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the hot reservation queries (slot lookups, account page, admin month view) '
+        'and fail if any of them scans the reservations table instead of using an index'
+    )
+
+    def get_queries(self):
+        """The hot queries, shaped exactly like the code that runs them"""
+        today = date.today()
+        month_start = today.replace(day=1)
+        month_end = month_start + timedelta(days=31)
+        user_id = 1
+        return [
+            ('Slot lookup (day)', availability._interval_rows(
+                availability._active_reservations().filter(date=today)
+            )),
+            ('Slot lookup (range)', availability._interval_rows(
+                availability._active_reservations().filter(date__gte=month_start, date__lte=month_end)
+            )),
+            ('Account future reservations', Reservation.objects.filter(
+                user_id=user_id, date__gte=today
+            ).order_by('date', 'start_time')),
+            ('Account past reservations', Reservation.objects.filter(
+                user_id=user_id, date__lt=today
+            ).order_by('-date', '-start_time')[:10]),
+            ('My reservations', Reservation.objects.filter(
+                user_id=user_id
+            ).order_by('-date', '-start_time')),
+            ('Admin month view', Reservation.objects.filter(
+                date__gte=month_start, date__lte=month_end
+            ).values_list('date', flat=True).order_by('date').distinct()),
+            ('Admin day view', Reservation.objects.filter(
+                date=today
+            ).select_related('user', 'treatment').order_by('start_time')),
+        ]
+
+    def is_table_scan(self, plan):
+        """Whether a plan reads the whole reservations table"""
+        table = Reservation._meta.db_table
+        if connection.vendor == 'postgresql':
+            return f'Seq Scan on {table}' in plan
+        if connection.vendor == 'sqlite':
+            # Index lookups read "SEARCH <table> USING INDEX ..."; "SCAN <table>"
+            # is a full pass, also when it walks an index for the ordering
+            return any(f' SCAN {table}' in f' {line}' for line in plan.splitlines())
+        raise CommandError(f'Query plan check is not supported on {connection.vendor}')
+
+    def handle(self, *args, **options):
+        table_scans = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to scan; force the planner to show whether an index is usable at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for label, queryset in self.get_queries():
+                plan = queryset.explain()
+                self.stdout.write(f'{label}:')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+                if self.is_table_scan(plan):
+                    table_scans.append(label)
+
+        if table_scans:
+            raise CommandError(f'Table scan in: {", ".join(table_scans)}')
+        self.stdout.write(self.style.SUCCESS('All hot reservation queries use an index'))
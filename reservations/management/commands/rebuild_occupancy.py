@@ -0,0 +1,67 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min, Max
+from reservations import availability, availability_cache
+from reservations.models import Reservation, DayOccupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DayOccupancy bitmaps from reservations (backfill), or check them for consistency'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report bitmaps that differ from reservations, do not write')
+        parser.add_argument('--from', dest='date_from', help='First date to process (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last date to process (YYYY-MM-DD)')
+    
+    def parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            raise CommandError(f'Invalid date: {value}')
+    
+    def handle(self, *args, **options):
+        date_from = self.parse_date(options['date_from'])
+        date_to = self.parse_date(options['date_to'])
+        
+        reservations = Reservation.objects.all()
+        occupancies = DayOccupancy.objects.all()
+        if date_from:
+            reservations = reservations.filter(date__gte=date_from)
+            occupancies = occupancies.filter(date__gte=date_from)
+        if date_to:
+            reservations = reservations.filter(date__lte=date_to)
+            occupancies = occupancies.filter(date__lte=date_to)
+        
+        bounds = reservations.aggregate(first=Min('date'), last=Max('date'))
+        first_date = date_from or bounds['first']
+        last_date = date_to or bounds['last']
+        busy_by_date = {}
+        if first_date and last_date:
+            busy_by_date = availability.get_busy_intervals_for_range(first_date, last_date)
+        
+        expected = {day: availability.build_occupancy_mask(intervals) for day, intervals in busy_by_date.items()}
+        stored = {occupancy.date: occupancy.mask for occupancy in occupancies}
+        
+        mismatched = sorted(
+            day for day in set(expected) | set(stored)
+            if expected.get(day, 0) != stored.get(day, 0)
+        )
+        
+        if options['check']:
+            for day in mismatched:
+                self.stdout.write(
+                    f'{day}: stored {DayOccupancy.format_mask(stored.get(day, 0))}, '
+                    f'expected {DayOccupancy.format_mask(expected.get(day, 0))}'
+                )
+            if mismatched:
+                raise CommandError(f'{len(mismatched)} day(s) with inconsistent occupancy')
+            self.stdout.write(self.style.SUCCESS(f'Occupancy consistent for {len(stored)} day(s)'))
+            return
+        
+        with transaction.atomic():
+            for day in mismatched:
+                availability.rebuild_day_occupancy(day)
+            transaction.on_commit(lambda: availability_cache.invalidate_dates(mismatched))
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt occupancy for {len(mismatched)} day(s)'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+def backfill_day_occupancy(apps, schema_editor):
+    """Build occupancy bitmaps for every date with active reservations"""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    DayOccupancy = apps.get_model('reservations', 'DayOccupancy')
+    
+    masks = {}
+    rows = Reservation.objects.filter(status__in=['pending', 'confirmed']).values_list(
+        'date', 'start_time', 'end_time', 'treatment__pause_hours', 'treatment__pause_minutes'
+    )
+    for day, start_time, end_time, pause_hours, pause_minutes in rows:
+        start = start_time.hour * 60 + start_time.minute
+        end = end_time.hour * 60 + end_time.minute + pause_hours * 60 + pause_minutes
+        first_slot = start // 15
+        last_slot = min(-(-end // 15), 96)
+        if last_slot > first_slot:
+            masks[day] = masks.get(day, 0) | (((1 << (last_slot - first_slot)) - 1) << first_slot)
+    
+    DayOccupancy.objects.bulk_create([
+        DayOccupancy(date=day, bitmap=f'{mask:024x}') for day, mask in masks.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+        ('treatments', '0002_treatment_pause_hours_treatment_pause_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Date')),
+                ('bitmap', models.CharField(default='000000000000000000000000', max_length=24, verbose_name='Occupancy Bitmap')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Day Occupancy',
+                'verbose_name_plural': 'Day Occupancy',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.RunPython(backfill_day_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:19
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def backfill_blocked_until(apps, schema_editor):
+    """
+    Store end time plus treatment pause on every reservation. Active
+    reservations whose pause runs into the next active reservation of the
+    same day (allowed before pauses were checked both ways) are clipped to
+    that start so the exclusion constraint can be created.
+    """
+    Reservation = apps.get_model('reservations', 'Reservation')
+    DayOccupancy = apps.get_model('reservations', 'DayOccupancy')
+
+    reservations = list(
+        Reservation.objects.select_related('treatment').order_by('date', 'start_time')
+    )
+    active_by_date = {}
+    for reservation in reservations:
+        end_datetime = datetime.combine(reservation.date, reservation.end_time)
+        pause = timedelta(minutes=reservation.treatment.pause_hours * 60 + reservation.treatment.pause_minutes)
+        blocked_datetime = end_datetime + pause
+        reservation.blocked_until = blocked_datetime.time() if blocked_datetime.date() == reservation.date else time.max
+        if reservation.status in ACTIVE_STATUSES:
+            active_by_date.setdefault(reservation.date, []).append(reservation)
+
+    masks = {}
+    for day, day_reservations in active_by_date.items():
+        for current, following in zip(day_reservations, day_reservations[1:] + [None]):
+            if following is not None and current.blocked_until > following.start_time:
+                current.blocked_until = max(following.start_time, current.start_time)
+            first_slot = to_minutes(current.start_time) // 15
+            last_slot = min(-(-to_minutes(current.blocked_until) // 15), 96)
+            if last_slot > first_slot:
+                masks[day] = masks.get(day, 0) | (((1 << (last_slot - first_slot)) - 1) << first_slot)
+
+    Reservation.objects.bulk_update(reservations, ['blocked_until'], batch_size=500)
+
+    DayOccupancy.objects.all().delete()
+    DayOccupancy.objects.bulk_create([
+        DayOccupancy(date=day, bitmap=f'{mask:024x}') for day, mask in masks.items()
+    ])
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    """Reject overlapping blocked ranges of active reservations (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # btree_gist provides the GiST operator class for the date equality
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE reservations_reservation "
+        "ADD CONSTRAINT reservation_no_overlap EXCLUDE USING gist ("
+        "date WITH =, "
+        "tsrange(date + start_time, date + blocked_until, '[)') WITH &&"
+        ") WHERE (status IN ('pending', 'confirmed'))"
+    )
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE reservations_reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_dayoccupancy'),
+        ('treatments', '0002_treatment_pause_hours_treatment_pause_minutes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='blocked_until',
+            field=models.TimeField(editable=False, help_text='End time plus the treatment pause', null=True, verbose_name='Blocked Until'),
+        ),
+        migrations.RunPython(backfill_blocked_until, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='reservation',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('date', 'start_time'), name='reservation_unique_active_start'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, remove_exclusion_constraint),
+    ]
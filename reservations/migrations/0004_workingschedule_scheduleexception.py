@@ -0,0 +1,73 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:26
+
+from datetime import time
+
+from django.db import migrations, models
+
+
+# Working hours previously hardcoded in Reservation.get_working_hours
+DEFAULT_WORKING_HOURS = {
+    0: (time(12, 0), time(20, 0)),  # Monday
+    1: (time(9, 0), time(17, 0)),   # Tuesday
+    2: (time(9, 0), time(17, 0)),   # Wednesday
+    3: (time(12, 0), time(20, 0)),  # Thursday
+    4: (time(9, 0), time(17, 0)),   # Friday
+    5: None,  # Saturday - Closed
+    6: None,  # Sunday - Closed
+}
+
+
+def seed_working_schedule(apps, schema_editor):
+    WorkingSchedule = apps.get_model('reservations', 'WorkingSchedule')
+    for day_of_week, working_hours in DEFAULT_WORKING_HOURS.items():
+        WorkingSchedule.objects.get_or_create(
+            day_of_week=day_of_week,
+            defaults={
+                'is_open': working_hours is not None,
+                'open_time': working_hours[0] if working_hours else None,
+                'close_time': working_hours[1] if working_hours else None,
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_blocked_until'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Start Date')),
+                ('end_date', models.DateField(blank=True, help_text='Leave empty for a single day', null=True, verbose_name='End Date')),
+                ('is_open', models.BooleanField(default=False, help_text='Leave unchecked for a closed day, check to set changed hours', verbose_name='Open')),
+                ('open_time', models.TimeField(blank=True, null=True, verbose_name='Opening Time')),
+                ('close_time', models.TimeField(blank=True, null=True, verbose_name='Closing Time')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Reason')),
+            ],
+            options={
+                'verbose_name': 'Schedule Exception',
+                'verbose_name_plural': 'Schedule Exceptions',
+                'ordering': ['start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkingSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], unique=True, verbose_name='Day of Week')),
+                ('is_open', models.BooleanField(default=True, verbose_name='Open')),
+                ('open_time', models.TimeField(blank=True, null=True, verbose_name='Opening Time')),
+                ('close_time', models.TimeField(blank=True, null=True, verbose_name='Closing Time')),
+            ],
+            options={
+                'verbose_name': 'Working Schedule',
+                'verbose_name_plural': 'Working Schedule',
+                'ordering': ['day_of_week'],
+            },
+        ),
+        migrations.RunPython(seed_working_schedule, migrations.RunPython.noop),
+    ]
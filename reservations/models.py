@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import User
 from treatments.models import Treatment
 from django.core.validators import MinValueValidator
+from django.core.exceptions import ValidationError
 from datetime import datetime, time, timedelta
 
 
@@ -13,12 +14,15 @@ class Reservation(models.Model):
         ('cancelled', _('Cancelled')),
         ('completed', _('Completed')),
     ]
+    # Statuses that occupy their time slot
+    ACTIVE_STATUSES = ['pending', 'confirmed']
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations')
     treatment = models.ForeignKey(Treatment, on_delete=models.CASCADE, related_name='reservations')
     date = models.DateField(_('Date'))
     start_time = models.TimeField(_('Start Time'))
     end_time = models.TimeField(_('End Time'))
+    blocked_until = models.TimeField(_('Blocked Until'), null=True, editable=False, help_text=_('End time plus the treatment pause'))
     status = models.CharField(_('Status'), max_length=20, choices=STATUS_CHOICES, default='confirmed')
     notes = models.TextField(_('Notes'), blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -28,78 +32,238 @@ class Reservation(models.Model):
         ordering = ['date', 'start_time']
         verbose_name = _('Reservation')
         verbose_name_plural = _('Reservations')
-        unique_together = [['date', 'start_time']]
+        constraints = [
+            # Overlaps of the blocked range are rejected by the PostgreSQL
+            # exclusion constraint added in migration 0003
+            models.UniqueConstraint(
+                fields=['date', 'start_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='reservation_unique_active_start',
+            ),
+        ]
+        indexes = [
+            # Busy interval lookups by date (availability, occupancy rebuilds),
+            # all columns they read are in the index
+            models.Index(
+                fields=['date', 'start_time', 'blocked_until'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='reservation_active_slot_idx',
+            ),
+            # A user's reservations by date (account page, my reservations)
+            models.Index(fields=['user', 'date', 'start_time'], name='reservation_user_date_idx'),
+            # Days and date ranges over all statuses (admin calendar)
+            models.Index(fields=['date', 'start_time'], name='reservation_date_start_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.treatment.title_hr} - {self.date} {self.start_time}"
     
-    def save(self, *args, **kwargs):
-        """Calculate end_time based on treatment duration"""
+    # Fields blocked_until is calculated from
+    TIMING_FIELDS = ('date', 'start_time', 'end_time', 'treatment_id')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_timing = instance.get_timing()
+        return instance
+    
+    def get_timing(self):
+        """Loaded values of TIMING_FIELDS (None for deferred fields)"""
+        return tuple(self.__dict__.get(field) for field in self.TIMING_FIELDS)
+    
+    def timing_changed(self):
+        """Whether blocked_until has to be calculated again"""
+        if getattr(self, '_stored_timing', None) != self.get_timing():
+            return True
+        return 'blocked_until' in self.__dict__ and self.blocked_until is None
+    
+    def set_end_time(self):
+        """Calculate end_time based on treatment duration if it is not set"""
         if not self.end_time:
             start_datetime = datetime.combine(self.date, self.start_time)
             duration_minutes = self.treatment.get_total_minutes()
             end_datetime = start_datetime + timedelta(minutes=duration_minutes)
             self.end_time = end_datetime.time()
-        super().save(*args, **kwargs)
+    
+    def clean(self):
+        """Reject an active reservation whose blocked time overlaps another active reservation"""
+        if self.status not in self.ACTIVE_STATUSES or not (self.date and self.start_time and self.treatment_id):
+            return
+        self.set_end_time()
+        blocked_until = self.blocked_until
+        if self.timing_changed():
+            blocked_until = self.calculate_blocked_until(self.date, self.end_time, self.treatment)
+        overlapping = Reservation.objects.filter(
+            date=self.date,
+            status__in=self.ACTIVE_STATUSES,
+            start_time__lt=blocked_until,
+            blocked_until__gt=self.start_time,
+        ).exclude(pk=self.pk).order_by('start_time').first()
+        if overlapping:
+            raise ValidationError(
+                _('This time overlaps the reservation from %(start)s to %(end)s (including the treatment pause).'),
+                params={
+                    'start': overlapping.start_time.strftime('%H:%M'),
+                    'end': overlapping.blocked_until.strftime('%H:%M'),
+                },
+            )
+    
+    def save(self, *args, **kwargs):
+        """Calculate end_time based on treatment duration and blocked_until based on treatment pause"""
+        self.set_end_time()
+        # Only when the times or the treatment change, so a reservation keeps the pause it was booked with
+        if self.timing_changed():
+            self.blocked_until = self.calculate_blocked_until(self.date, self.end_time, self.treatment)
+            if 'update_fields' in kwargs and kwargs['update_fields'] is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'blocked_until'}
+        # Day occupancy is rebuilt in post_save, keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._stored_timing = self.get_timing()
+    
+    @staticmethod
+    def calculate_blocked_until(date, end_time, treatment):
+        """End time plus the treatment pause, capped at the end of the day"""
+        end_datetime = datetime.combine(date, end_time)
+        blocked_datetime = end_datetime + timedelta(minutes=treatment.get_total_pause_minutes())
+        if blocked_datetime.date() != date:
+            return time.max
+        return blocked_datetime.time()
     
     @staticmethod
     def get_working_hours(day_of_week):
-        """Get working hours for a specific day (0=Monday, 6=Sunday)"""
-        working_hours = {
-            0: (time(12, 0), time(20, 0)),  # Monday
-            1: (time(9, 0), time(17, 0)),   # Tuesday
-            2: (time(9, 0), time(17, 0)),   # Wednesday
-            3: (time(12, 0), time(20, 0)),  # Thursday
-            4: (time(9, 0), time(17, 0)),   # Friday
-            5: None,  # Saturday - Closed
-            6: None,  # Sunday - Closed
-        }
-        return working_hours.get(day_of_week)
+        """Get regular weekly working hours for a specific day (0=Monday, 6=Sunday)"""
+        # Import here to avoid circular imports
+        from .schedule import get_schedule
+        return get_schedule().weekly.get(day_of_week)
+    
+    @staticmethod
+    def get_working_hours_for_date(date):
+        """Get working hours for a date, including holidays and changed hours"""
+        # Import here to avoid circular imports
+        from .schedule import get_working_hours
+        return get_working_hours(date)
     
     @staticmethod
     def is_available(date, start_time, treatment, exclude_reservation=None):
         """Check if a time slot is available"""
-        # Check if day is working day
-        day_of_week = date.weekday()
-        working_hours = Reservation.get_working_hours(day_of_week)
-        if not working_hours:
-            return False
-        
-        # Check if start_time is within working hours
-        if start_time < working_hours[0] or start_time >= working_hours[1]:
-            return False
-        
-        # Calculate end_time
-        start_datetime = datetime.combine(date, start_time)
-        duration_minutes = treatment.get_total_minutes()
-        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-        end_time = end_datetime.time()
-        
-        # Check if end_time is within working hours
-        if end_time > working_hours[1]:
-            return False
-        
-        # Check for overlapping reservations (including pause periods)
-        existing_reservations = Reservation.objects.filter(
-            date=date,
-            status__in=['pending', 'confirmed'],
-        ).exclude(
-            id=exclude_reservation.id if exclude_reservation else None
-        )
-        
-        for reservation in existing_reservations:
-            res_start = datetime.combine(date, reservation.start_time)
-            res_end = datetime.combine(date, reservation.end_time)
-            # Add pause period after reservation
-            pause_minutes = reservation.treatment.get_total_pause_minutes()
-            res_end_with_pause = res_end + timedelta(minutes=pause_minutes)
-            
-            # Check if the new slot overlaps with reservation + pause
-            # The new slot overlaps if:
-            # - It starts before the reservation+pause ends AND
-            # - It ends after the reservation starts
-            if not (start_datetime >= res_end_with_pause or end_datetime <= res_start):
-                return False
-        
-        return True
+        # Import here to avoid circular imports
+        from .availability import is_slot_available
+        return is_slot_available(date, start_time, treatment, exclude_reservation)
+
+
+class DayOccupancy(models.Model):
+    """
+    Occupancy bitmap of a day: one bit per 15-minute slot (96 per day) for
+    booked time including treatment pauses. Bit 0 is 00:00-00:15.
+    Maintained by reservations.signals in the same transaction as the
+    reservation change.
+    """
+    date = models.DateField(_('Date'), unique=True)
+    bitmap = models.CharField(_('Occupancy Bitmap'), max_length=24, default='0' * 24)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        verbose_name = _('Day Occupancy')
+        verbose_name_plural = _('Day Occupancy')
+    
+    def __str__(self):
+        return f"{self.date} - {self.bitmap}"
+    
+    @staticmethod
+    def parse_mask(bitmap):
+        """Convert a stored hex bitmap to an integer mask"""
+        return int(bitmap, 16)
+    
+    @staticmethod
+    def format_mask(mask):
+        """Convert an integer mask to its stored hex bitmap"""
+        return f'{mask:024x}'
+    
+    @property
+    def mask(self):
+        return self.parse_mask(self.bitmap)
+
+
+class WorkingSchedule(models.Model):
+    """Regular weekly working hours, one row per day of the week"""
+    DAY_CHOICES = [
+        (0, _('Monday')),
+        (1, _('Tuesday')),
+        (2, _('Wednesday')),
+        (3, _('Thursday')),
+        (4, _('Friday')),
+        (5, _('Saturday')),
+        (6, _('Sunday')),
+    ]
+    
+    day_of_week = models.PositiveSmallIntegerField(_('Day of Week'), choices=DAY_CHOICES, unique=True)
+    is_open = models.BooleanField(_('Open'), default=True)
+    open_time = models.TimeField(_('Opening Time'), null=True, blank=True)
+    close_time = models.TimeField(_('Closing Time'), null=True, blank=True)
+    
+    class Meta:
+        ordering = ['day_of_week']
+        verbose_name = _('Working Schedule')
+        verbose_name_plural = _('Working Schedule')
+    
+    def __str__(self):
+        if not self.is_open:
+            return f"{self.get_day_of_week_display()} - {_('Closed')}"
+        return f"{self.get_day_of_week_display()} - {self.open_time:%H:%M}-{self.close_time:%H:%M}"
+    
+    def clean(self):
+        validate_opening_hours(self.is_open, self.open_time, self.close_time)
+    
+    @property
+    def working_hours(self):
+        """(open_time, close_time), or None if closed"""
+        return (self.open_time, self.close_time) if self.is_open else None
+
+
+class ScheduleException(models.Model):
+    """Holiday, vacation or one-off changed hours overriding the weekly schedule for a date range"""
+    start_date = models.DateField(_('Start Date'))
+    end_date = models.DateField(_('End Date'), null=True, blank=True, help_text=_('Leave empty for a single day'))
+    is_open = models.BooleanField(_('Open'), default=False, help_text=_('Leave unchecked for a closed day, check to set changed hours'))
+    open_time = models.TimeField(_('Opening Time'), null=True, blank=True)
+    close_time = models.TimeField(_('Closing Time'), null=True, blank=True)
+    reason = models.CharField(_('Reason'), max_length=200, blank=True)
+    
+    class Meta:
+        ordering = ['start_date']
+        verbose_name = _('Schedule Exception')
+        verbose_name_plural = _('Schedule Exceptions')
+    
+    def __str__(self):
+        dates = f"{self.start_date}" if not self.end_date or self.end_date == self.start_date else f"{self.start_date} - {self.end_date}"
+        return f"{dates} {self.reason}".strip()
+    
+    def clean(self):
+        if self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': _('End date cannot be before the start date.')})
+        validate_opening_hours(self.is_open, self.open_time, self.close_time)
+    
+    @property
+    def working_hours(self):
+        """(open_time, close_time), or None if closed"""
+        return (self.open_time, self.close_time) if self.is_open else None
+    
+    def get_dates(self):
+        """Every date covered by this exception"""
+        day = self.start_date
+        end_date = self.end_date or self.start_date
+        while day <= end_date:
+            yield day
+            day += timedelta(days=1)
+
 
+def validate_opening_hours(is_open, open_time, close_time):
+    """Open days need an opening time before the closing time"""
+    if not is_open:
+        return
+    if open_time is None or close_time is None:
+        raise ValidationError(_('Opening and closing time are required on open days.'))
+    if open_time >= close_time:
+        raise ValidationError({'close_time': _('Closing time must be after the opening time.')})
@@ -0,0 +1,89 @@
+"""
+Working hours resolution.
+
+The weekly WorkingSchedule and all ScheduleException rows are compiled
+once per process into plain dicts (weekday -> hours, date -> hours), so
+resolving the hours of a date is a dict lookup instead of a query. Saving
+or deleting a schedule row bumps a version in the default cache (see
+reservations.signals); every process compares it with the version it
+compiled and recompiles when it changed. Other processes only see the bump
+if the cache is shared between them (CACHE_URL); with the local-memory
+default, run a single process.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import WorkingSchedule, ScheduleException
+
+VERSION_KEY = 'schedule:version'
+
+_compiled = None
+_compile_lock = threading.Lock()
+
+
+class CompiledSchedule:
+    """Weekly working hours and exception dates resolved to (open, close) or None"""
+
+    def __init__(self, version, weekly, exceptions):
+        self.version = version
+        self.weekly = weekly
+        self.exceptions = exceptions
+
+    def get_working_hours(self, date):
+        """Working hours of a date as (open_time, close_time), or None if closed"""
+        if date in self.exceptions:
+            return self.exceptions[date]
+        return self.weekly.get(date.weekday())
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Time-based so an evicted version never matches an old compilation
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def compile_schedule(version=None):
+    """Load the schedule tables into a CompiledSchedule (two queries)"""
+    weekly = {
+        schedule.day_of_week: schedule.working_hours
+        for schedule in WorkingSchedule.objects.all()
+    }
+    exceptions = {}
+    # Later exceptions win where ranges overlap
+    for exception in ScheduleException.objects.order_by('start_date', 'id'):
+        for day in exception.get_dates():
+            exceptions[day] = exception.working_hours
+    return CompiledSchedule(version, weekly, exceptions)
+
+
+def get_schedule():
+    """Get the process-local compiled schedule, recompiling it if the shared version moved"""
+    global _compiled
+    version = _get_version()
+    compiled = _compiled
+    if compiled is None or compiled.version != version:
+        with _compile_lock:
+            compiled = _compiled
+            if compiled is None or compiled.version != version:
+                compiled = _compiled = compile_schedule(version)
+    return compiled
+
+
+def get_working_hours(date):
+    """Working hours of a date as (open_time, close_time), or None if closed"""
+    return get_schedule().get_working_hours(date)
+
+
+def invalidate():
+    """Make every process recompile the schedule on its next lookup"""
+    global _compiled
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _compiled = None
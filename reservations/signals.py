@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Reservation, WorkingSchedule, ScheduleException
+from . import availability, availability_cache, schedule
+
+
+def invalidate_availability_on_commit(dates):
+    """Invalidate cached availability for the given dates once the transaction commits"""
+    dates = {day for day in dates if day}
+    if dates:
+        transaction.on_commit(lambda: availability_cache.invalidate_dates(dates))
+
+
+def update_occupancy(dates):
+    """Rebuild the occupancy bitmaps of the given dates and invalidate their cached availability"""
+    dates = {day for day in dates if day}
+    for day in dates:
+        availability.rebuild_day_occupancy(day)
+    invalidate_availability_on_commit(dates)
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_previous_reservation_date(sender, instance, **kwargs):
+    """Remember the stored date so moving a reservation invalidates both days"""
+    instance._previous_date = None
+    if instance.pk:
+        instance._previous_date = Reservation.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=Reservation)
+def update_occupancy_on_reservation_save(sender, instance, **kwargs):
+    """Update occupancy when a reservation is created, edited or cancelled"""
+    update_occupancy([instance.date, getattr(instance, '_previous_date', None)])
+
+
+@receiver(post_delete, sender=Reservation)
+def update_occupancy_on_reservation_delete(sender, instance, **kwargs):
+    """Update occupancy when a reservation is deleted"""
+    update_occupancy([instance.date])
+
+
+@receiver(post_save, sender=WorkingSchedule)
+@receiver(post_delete, sender=WorkingSchedule)
+@receiver(post_save, sender=ScheduleException)
+@receiver(post_delete, sender=ScheduleException)
+def invalidate_schedule(sender, **kwargs):
+    """Recompile the working schedule in every process once the change commits"""
+    transaction.on_commit(schedule.invalidate)
@@ -0,0 +1,192 @@
+from datetime import date, time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from treatments.models import Treatment
+from . import availability, schedule
+from .management.commands.check_query_plans import Command as CheckQueryPlansCommand
+from .models import Reservation, ScheduleException, WorkingSchedule
+
+
+class ReservationTimingTests(TestCase):
+    """Overlap validation and blocked_until of reservations edited outside the booking flow"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        # No image files in tests, variants are not generated
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            cls.treatment = Treatment.objects.create(
+                title_hr='t', title_en='t', slug_hr='t', slug_en='t-en',
+                short_description_hr='s', short_description_en='s',
+                duration_hours=1, pause_minutes=30, price=10,
+                thumbnail='treatments/thumbnails/t.jpg',
+            )
+        cls.day = date(2030, 1, 7)
+        cls.booked = Reservation.objects.create(
+            user=cls.user, treatment=cls.treatment, date=cls.day, start_time=time(10, 0),
+        )
+    
+    def test_blocked_until_includes_pause(self):
+        self.assertEqual(self.booked.end_time, time(11, 0))
+        self.assertEqual(self.booked.blocked_until, time(11, 30))
+    
+    def test_pause_kept_when_times_unchanged(self):
+        Treatment.objects.filter(pk=self.treatment.pk).update(pause_minutes=0)
+        reservation = Reservation.objects.get(pk=self.booked.pk)
+        reservation.status = 'pending'
+        reservation.save(update_fields=['status'])
+        reservation.notes = 'note'
+        reservation.save()
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.blocked_until, time(11, 30))
+    
+    def test_pause_recalculated_when_moved(self):
+        Treatment.objects.filter(pk=self.treatment.pk).update(pause_minutes=0)
+        reservation = Reservation.objects.get(pk=self.booked.pk)
+        reservation.start_time = time(12, 0)
+        reservation.end_time = time(13, 0)
+        reservation.save(update_fields=['start_time', 'end_time'])
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.blocked_until, time(13, 0))
+    
+    def test_clean_rejects_overlap_with_pause(self):
+        reservation = Reservation(
+            user=self.user, treatment=self.treatment, date=self.day, start_time=time(11, 15), end_time=time(12, 15),
+        )
+        with self.assertRaises(ValidationError) as context:
+            reservation.full_clean()
+        self.assertIn('10:00', str(context.exception.messages))
+    
+    def test_clean_allows_cancelled_and_adjacent(self):
+        Reservation(
+            user=self.user, treatment=self.treatment, date=self.day, start_time=time(11, 30), end_time=time(12, 30),
+        ).full_clean()
+        Reservation(
+            user=self.user, treatment=self.treatment, date=self.day, start_time=time(10, 30), end_time=time(11, 30),
+            status='cancelled',
+        ).full_clean()
+    
+    def test_admin_reports_overlap_as_form_error(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('admin:reservations_reservation_add'), {
+            'user': self.user.pk,
+            'treatment': self.treatment.pk,
+            'date': '2030-01-07',
+            'start_time': '09:30',
+            'end_time': '10:30',
+            'status': 'confirmed',
+            'notes': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['adminform'].form.non_field_errors())
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+class QueryPlanTests(TestCase):
+    """The hot reservation queries keep using their indexes"""
+    
+    def test_no_table_scans(self):
+        # check_query_plans knows how a table scan reads on SQLite and PostgreSQL
+        # (where it also turns off enable_seqscan, so small tables still show index use)
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertIn('All hot reservation queries use an index', output.getvalue())
+    
+    def test_table_scan_detected(self):
+        command = CheckQueryPlansCommand()
+        scan = Reservation.objects.filter(notes='x').order_by().explain()
+        index = Reservation.objects.filter(date=date(2030, 1, 7)).explain()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            index = Reservation.objects.filter(date=date(2030, 1, 7)).explain()
+        self.assertTrue(command.is_table_scan(scan))
+        self.assertFalse(command.is_table_scan(index))
+
+
+class AvailabilityEngineTests(TestCase):
+    """Free slots from the occupancy bitmap, including the adjacent and pause edges"""
+    
+    HOURS = (time(9, 0), time(12, 0))
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'password')
+        with mock.patch('naomi_face_studio.image_variants.generate_variants', return_value={'variants': []}):
+            cls.treatment = Treatment.objects.create(
+                title_hr='t', title_en='t', slug_hr='t', slug_en='t-en',
+                short_description_hr='s', short_description_en='s',
+                duration_hours=1, pause_minutes=30, price=10,
+                thumbnail='treatments/thumbnails/t.jpg',
+            )
+        # A Monday
+        cls.day = date(2030, 1, 7)
+        WorkingSchedule.objects.update_or_create(
+            day_of_week=cls.day.weekday(),
+            defaults={'is_open': True, 'open_time': cls.HOURS[0], 'close_time': cls.HOURS[1]},
+        )
+    
+    def setUp(self):
+        cache.clear()
+        schedule.invalidate()
+        self.addCleanup(schedule.invalidate)
+    
+    def book(self, start):
+        return Reservation.objects.create(user=self.user, treatment=self.treatment, date=self.day, start_time=start)
+    
+    def test_compute_free_slots_around_booking(self):
+        # Booked 10:00-11:00 without a pause
+        mask = availability.interval_bits(600, 660)
+        self.assertEqual(availability.compute_free_slots(self.HOURS, mask, 60), [540, 660])
+    
+    def test_compute_free_slots_keeps_own_pause_free(self):
+        mask = availability.interval_bits(600, 660)
+        # 9:00 would run its pause into the booking, 11:00 may pause past closing
+        self.assertEqual(availability.compute_free_slots(self.HOURS, mask, 60, pause_minutes=30), [660])
+    
+    def test_compute_free_slots_from_earliest_start(self):
+        slots = availability.compute_free_slots(self.HOURS, 0, 60, earliest_start=9 * 60 + 5)
+        self.assertEqual(slots[0], 9 * 60 + 15)
+        self.assertEqual(slots[-1], 11 * 60)
+    
+    def test_slot_after_pause_is_available(self):
+        self.book(time(9, 0))
+        # Blocked until 10:30 (one hour plus the 30 minute pause)
+        self.assertFalse(availability.is_slot_available(self.day, time(10, 15), self.treatment))
+        self.assertTrue(availability.is_slot_available(self.day, time(10, 30), self.treatment))
+    
+    def test_slot_whose_pause_overlaps_is_unavailable(self):
+        self.book(time(11, 0))
+        # Ends at 11:00 but its pause would run into the booking
+        self.assertFalse(availability.is_slot_available(self.day, time(10, 0), self.treatment))
+        self.assertTrue(availability.is_slot_available(self.day, time(9, 30), self.treatment))
+    
+    def test_slot_outside_working_hours(self):
+        self.assertFalse(availability.is_slot_available(self.day, time(8, 45), self.treatment))
+        self.assertFalse(availability.is_slot_available(self.day, time(11, 15), self.treatment))
+    
+    def test_edited_reservation_ignores_itself(self):
+        reservation = self.book(time(9, 0))
+        self.assertFalse(availability.is_slot_available(self.day, time(9, 15), self.treatment))
+        self.assertTrue(availability.is_slot_available(self.day, time(9, 15), self.treatment, reservation))
+    
+    def test_closed_exception(self):
+        ScheduleException.objects.create(start_date=self.day, reason='Holiday')
+        schedule.invalidate()
+        self.assertFalse(availability.is_slot_available(self.day, time(9, 0), self.treatment))
+        self.assertIsNone(availability.get_available_slots(self.day, self.treatment))
+    
+    def test_available_slots_skip_booked_time(self):
+        # Blocked 10:30-12:00, only 9:00 keeps its own pause clear of it
+        self.book(time(10, 30))
+        slots = availability.get_available_slots(self.day, self.treatment)
+        self.assertEqual(slots, [(time(9, 0), time(10, 0))])
@@ -6,12 +6,14 @@ from django.views.decorators.http import require_http_methods
 from django.utils.translation import get_language, activate, gettext as _
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from datetime import datetime, timedelta, date, time as dt_time
 from .models import Reservation
+from . import availability, booking
 from treatments.models import Treatment
-from core.models import EmailCollection
+from core import mail
+from core.models import EmailCollection, EmailOutbox
 import json
 import logging
 
@@ -40,31 +42,20 @@ def send_reservation_emails(reservation, language_code='hr'):
             'treatment_title': treatment_title,
         }
         
+        # Render both emails first, then queue them together
         # User email - translate subject
         user_subject = _('Reservation Confirmation - %(treatment)s') % {'treatment': treatment_title}
         user_message = render_to_string('reservations/emails/user_confirmation.html', context)
-        send_mail(
-            user_subject,
-            user_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [reservation.user.email],
-            html_message=user_message,
-            fail_silently=False,
-        )
-        logger.info(f"Reservation confirmation email sent to user: {reservation.user.email} for reservation ID: {reservation.id}")
         
         # Admin email - translate subject
         admin_subject = _('New Reservation - %(treatment)s') % {'treatment': treatment_title}
         admin_message = render_to_string('reservations/emails/admin_notification.html', context)
-        send_mail(
-            admin_subject,
-            admin_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [settings.ADMIN_EMAIL],
-            html_message=admin_message,
-            fail_silently=False,
-        )
-        logger.info(f"Reservation notification email sent to admin for reservation ID: {reservation.id}")
+        
+        EmailOutbox.enqueue_messages([
+            mail.build_html_email(user_subject, user_message, [reservation.user.email]),
+            mail.build_html_email(admin_subject, admin_message, [settings.ADMIN_EMAIL]),
+        ])
+        logger.info(f"Reservation emails queued to user: {reservation.user.email} and admin for reservation ID: {reservation.id}")
     except Exception as e:
         logger.error(f"Failed to send reservation emails for reservation ID: {reservation.id}. Error: {str(e)}", exc_info=True)
         raise
@@ -98,15 +89,12 @@ def send_cancellation_email(reservation, language_code='hr'):
         # Translate subject
         admin_subject = _('Reservation Cancelled - %(treatment)s') % {'treatment': treatment_title}
         admin_message = render_to_string('reservations/emails/cancellation_notification.html', context)
-        send_mail(
+        EmailOutbox.enqueue(
             admin_subject,
             admin_message,
-            settings.DEFAULT_FROM_EMAIL,
             [settings.ADMIN_EMAIL],
-            html_message=admin_message,
-            fail_silently=False,
         )
-        logger.info(f"Cancellation email sent to admin for reservation ID: {reservation.id}")
+        logger.info(f"Cancellation email queued to admin for reservation ID: {reservation.id}")
     except Exception as e:
         logger.error(f"Failed to send cancellation email for reservation ID: {reservation.id}. Error: {str(e)}", exc_info=True)
         raise
@@ -127,7 +115,7 @@ def reservation_calendar(request, treatment_slug=None):
     else:
         treatment = None
     
-    treatments = Treatment.objects.filter(is_active=True)
+    treatments = Treatment.objects.filter(is_active=True).for_listing()
     
     # Get current date in Croatia timezone for calendar
     today_croatia = timezone.localtime(timezone.now()).date()
@@ -156,90 +144,55 @@ def get_available_slots(request):
     except (Treatment.DoesNotExist, ValueError):
         return JsonResponse({'error': 'Invalid treatment or date'}, status=400)
     
-    # Get working hours for the day
-    day_of_week = selected_date.weekday()
-    working_hours = Reservation.get_working_hours(day_of_week)
+    slots = availability.get_available_slots(selected_date, treatment)
     
-    if not working_hours:
-        # Day is closed (Saturday or Sunday)
+    if slots is None:
+        # Closed by the working schedule (weekly hours, holiday or other exception)
         return JsonResponse({
             'available_slots': [],
             'reason': 'closed',
-            'message': 'This day is closed (Saturday or Sunday)'
+            'message': 'The studio is closed on this day'
         })
     
-    # Get existing reservations for the date
-    existing_reservations = Reservation.objects.filter(
-        date=selected_date,
-        status__in=['pending', 'confirmed']
-    )
+    available_slots = [
+        {
+            'start': slot_start.strftime('%H:%M'),
+            'end': slot_end.strftime('%H:%M'),
+        }
+        for slot_start, slot_end in slots
+    ]
     
-    # Generate time slots
-    available_slots = []
-    start_time = working_hours[0]
-    end_time = working_hours[1]
-    slot_duration = timedelta(minutes=15)  # 15-minute intervals
-    treatment_duration = timedelta(minutes=treatment.get_total_minutes())
+    return JsonResponse({'available_slots': available_slots})
+
+
+@require_http_methods(["GET"])
+def get_availability(request):
+    """API endpoint to get per-day availability for a date range (e.g. a calendar month)"""
+    treatment_id = request.GET.get('treatment_id')
+    date_from = request.GET.get('from')
+    date_to = request.GET.get('to')
     
-    current_time = datetime.combine(selected_date, start_time)
-    end_datetime = datetime.combine(selected_date, end_time)
+    if not treatment_id or not date_from or not date_to:
+        return JsonResponse({'error': 'Missing parameters'}, status=400)
     
-    # Get current datetime in Croatia timezone (settings.TIME_ZONE = 'Europe/Zagreb')
-    # timezone.localtime() converts UTC to the timezone set in settings.TIME_ZONE
-    now_croatia = timezone.localtime(timezone.now())
-    today_croatia = now_croatia.date()
+    try:
+        treatment = Treatment.objects.get(id=treatment_id, is_active=True)
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+    except (Treatment.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Invalid treatment or date'}, status=400)
     
-    if selected_date == today_croatia:
-        # If selecting today, start from current time in Croatia + 1 hour buffer
-        now_time_croatia = now_croatia.replace(second=0, microsecond=0) + timedelta(hours=1)
-        # Create timezone-aware datetime from current_time (assume Croatia timezone)
-        # For comparison, we need both datetimes to be timezone-aware
-        current_time_aware = timezone.make_aware(current_time)
-        
-        if current_time_aware < now_time_croatia:
-            current_time_aware = now_time_croatia
-            # Round up to next 15-minute interval
-            minutes_to_add = 15 - (current_time_aware.minute % 15)
-            if minutes_to_add < 15:
-                current_time_aware += timedelta(minutes=minutes_to_add)
-            # Convert back to naive datetime (in Croatia timezone) for the loop
-            current_time = current_time_aware.astimezone(timezone.get_current_timezone()).replace(tzinfo=None)
+    if date_to < date_from or (date_to - date_from).days >= availability.MAX_RANGE_DAYS:
+        return JsonResponse({'error': 'Invalid date range'}, status=400)
     
-    while current_time + treatment_duration <= end_datetime:
-        slot_start = current_time.time()
-        slot_end = (current_time + treatment_duration).time()
-        
-        # Skip if slot is in the past (for today) - compare in Croatia timezone
-        if selected_date == today_croatia:
-            current_time_aware = timezone.make_aware(current_time)
-            if current_time_aware < now_croatia:
-                current_time += slot_duration
-                continue
-        
-        # Check if slot is available
-        is_available = True
-        for reservation in existing_reservations:
-            res_start = datetime.combine(selected_date, reservation.start_time)
-            res_end = datetime.combine(selected_date, reservation.end_time)
-            # Add pause period after reservation
-            pause_minutes = reservation.treatment.get_total_pause_minutes()
-            res_end_with_pause = res_end + timedelta(minutes=pause_minutes)
-            
-            # Check for overlap (including pause period)
-            # Slot is available if it starts after reservation+pause ends OR ends before reservation starts
-            if not (current_time >= res_end_with_pause or current_time + treatment_duration <= res_start):
-                is_available = False
-                break
-        
-        if is_available:
-            available_slots.append({
-                'start': slot_start.strftime('%H:%M'),
-                'end': slot_end.strftime('%H:%M'),
-            })
-        
-        current_time += slot_duration
+    days = availability.get_range_availability(date_from, date_to, treatment)
     
-    return JsonResponse({'available_slots': available_slots})
+    return JsonResponse({
+        'days': {
+            day.isoformat(): {'state': state, 'free_slots': free_slots}
+            for day, (state, free_slots) in days.items()
+        }
+    })
 
 
 @login_required
@@ -263,18 +216,20 @@ def create_reservation(request):
     except (Treatment.DoesNotExist, ValueError):
         return JsonResponse({'error': 'Invalid data'}, status=400)
     
-    # Check if slot is available
-    if not Reservation.is_available(reservation_date, start_time, treatment):
-        return JsonResponse({'error': 'Time slot is not available'}, status=400)
-    
-    # Create reservation
-    reservation = Reservation.objects.create(
-        user=request.user,
-        treatment=treatment,
-        date=reservation_date,
-        start_time=start_time,
-        notes=message,
-    )
+    # Create reservation (serialized per date, see reservations.booking)
+    # and queue its notifications in the same transaction
+    try:
+        with transaction.atomic():
+            reservation = booking.create_reservation(
+                user=request.user,
+                treatment=treatment,
+                date=reservation_date,
+                start_time=start_time,
+                notes=message,
+            )
+            send_reservation_emails(reservation, get_language()[:2])
+    except booking.SlotUnavailable:
+        return JsonResponse({'error': 'Time slot is not available'}, status=409)
     
     # Collect email with user details (only if not already archived)
     profile = getattr(request.user, 'profile', None)
@@ -288,9 +243,6 @@ def create_reservation(request):
         update_user_info=False,  # Don't update if email already exists
     )
     
-    # Send email notifications
-    send_reservation_emails(reservation, get_language()[:2])
-    
     return JsonResponse({
         'success': True,
         'reservation_id': reservation.id,
@@ -318,11 +270,12 @@ def cancel_reservation(request, reservation_id):
     if reservation.status == 'cancelled':
         return JsonResponse({'error': 'Reservation already cancelled'}, status=400)
     
-    reservation.status = 'cancelled'
-    reservation.save()
-    
-    # Send cancellation email
-    send_cancellation_email(reservation, get_language()[:2])
+    with transaction.atomic():
+        reservation.status = 'cancelled'
+        reservation.save()
+        
+        # Queue cancellation email
+        send_cancellation_email(reservation, get_language()[:2])
     
     return JsonResponse({'success': True, 'message': 'Reservation cancelled'})
 
@@ -0,0 +1,156 @@
+// Direct-to-R2 admin uploads (see core/direct_upload.py).
+// Files go from the browser to a presigned R2 URL; Django only issues the
+// URL and confirms the upload, so no worker streams the file.
+(function () {
+    'use strict';
+
+    function getCsrfToken() {
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function postForm(url, data) {
+        const body = new URLSearchParams(data);
+        return fetch(url, {
+            method: 'POST',
+            headers: {'X-CSRFToken': getCsrfToken()},
+            body: body,
+            credentials: 'same-origin',
+        }).then(function (response) {
+            return response.json().then(function (result) {
+                if (!response.ok) {
+                    throw new Error(result.error || `Upload failed (${response.status})`);
+                }
+                return result;
+            });
+        });
+    }
+
+    function putFile(url, headers, file, onProgress) {
+        // XMLHttpRequest instead of fetch for upload progress events
+        return new Promise(function (resolve, reject) {
+            const xhr = new XMLHttpRequest();
+            xhr.open('PUT', url);
+            Object.keys(headers).forEach(function (name) {
+                xhr.setRequestHeader(name, headers[name]);
+            });
+            xhr.upload.addEventListener('progress', function (event) {
+                if (onProgress && event.lengthComputable) {
+                    onProgress(event.loaded, event.total);
+                }
+            });
+            xhr.addEventListener('load', function () {
+                if (xhr.status >= 200 && xhr.status < 300) {
+                    resolve();
+                } else {
+                    reject(new Error(`Upload failed (${xhr.status})`));
+                }
+            });
+            xhr.addEventListener('error', function () {
+                reject(new Error('Upload failed'));
+            });
+            xhr.send(file);
+        });
+    }
+
+    // Presign, upload and confirm a file, resolves to {name, url, token}
+    function uploadFile(config, target, file, onProgress) {
+        return postForm(config.presignUrl, {
+            target: target,
+            filename: file.name,
+            content_type: file.type,
+            size: file.size,
+        }).then(function (presigned) {
+            return putFile(presigned.url, presigned.headers, file, onProgress).then(function () {
+                return postForm(config.confirmUrl, {token: presigned.token});
+            });
+        });
+    }
+
+    function setupFileInput(hidden) {
+        const config = {presignUrl: hidden.dataset.presignUrl, confirmUrl: hidden.dataset.confirmUrl};
+        const fileInput = document.querySelector(`input[type=file][name="${hidden.dataset.directUpload}"]`);
+        if (!fileInput) {
+            return;
+        }
+        const form = fileInput.form;
+        const status = document.createElement('span');
+        status.className = 'help';
+        fileInput.insertAdjacentElement('afterend', status);
+        let pending = 0;
+
+        fileInput.addEventListener('change', function () {
+            const file = fileInput.files[0];
+            if (!file) {
+                return;
+            }
+            pending++;
+            hidden.value = '';
+            status.textContent = ' Uploading…';
+            uploadFile(config, hidden.dataset.target, file, function (loaded, total) {
+                status.textContent = ` Uploading… ${Math.round(loaded * 100 / total)}%`;
+            }).then(function (result) {
+                // The form submits the token instead of the file
+                hidden.value = result.token;
+                fileInput.value = '';
+                fileInput.required = false;
+                status.textContent = ` Uploaded: ${result.name}`;
+            }).catch(function (error) {
+                // Leave the file selected so it is submitted with the form as before
+                status.textContent = ` ${error.message}`;
+            }).finally(function () {
+                pending--;
+            });
+        });
+
+        if (form) {
+            form.addEventListener('submit', function (event) {
+                if (pending > 0) {
+                    event.preventDefault();
+                    alert('Please wait until the upload has finished.');
+                }
+            });
+        }
+    }
+
+    function setupEditor(editor, config) {
+        if (editor.directUploadReady) {
+            return;
+        }
+        editor.directUploadReady = true;
+        // Runs before the uploadimage plugin's own request (priority 999) and replaces it
+        editor.on('fileUploadRequest', function (event) {
+            const loader = event.data.fileLoader;
+            event.stop();
+            uploadFile(config, 'ckeditor', loader.file, function (loaded, total) {
+                loader.uploaded = loaded;
+                loader.uploadTotal = total;
+                loader.update();
+            }).then(function (result) {
+                loader.url = result.url;
+                loader.changeStatus('uploaded');
+            }).catch(function (error) {
+                loader.message = error.message;
+                loader.changeStatus('error');
+            });
+        }, null, null, 5);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const inputs = document.querySelectorAll('input[data-direct-upload]');
+        if (!inputs.length) {
+            return;
+        }
+        inputs.forEach(setupFileInput);
+
+        if (window.CKEDITOR) {
+            const config = {presignUrl: inputs[0].dataset.presignUrl, confirmUrl: inputs[0].dataset.confirmUrl};
+            Object.keys(CKEDITOR.instances).forEach(function (name) {
+                setupEditor(CKEDITOR.instances[name], config);
+            });
+            CKEDITOR.on('instanceCreated', function (event) {
+                setupEditor(event.editor, config);
+            });
+        }
+    });
+})();
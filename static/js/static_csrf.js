@@ -0,0 +1,22 @@
+// CSRF tokens for statically exported pages (see naomi_face_studio/site_export.py).
+// Exported pages are shared by all visitors, so their forms are published
+// with empty tokens and this script fetches the visitor's own.
+(function () {
+    'use strict';
+
+    const csrfUrl = document.currentScript.dataset.csrfUrl;
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const inputs = document.querySelectorAll('input[name=csrfmiddlewaretoken][value=""]');
+        if (!inputs.length) {
+            return;
+        }
+        fetch(csrfUrl, {credentials: 'same-origin', cache: 'no-store'}).then(function (response) {
+            return response.json();
+        }).then(function (result) {
+            inputs.forEach(function (input) {
+                input.value = result.token;
+            });
+        });
+    });
+})();
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('treatments', '0005_treatment_full_description_en_rendered_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(fields=['created_at', 'id'], name='treatment_created_id_idx'),
+        ),
+    ]
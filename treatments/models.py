@@ -11,12 +11,25 @@ def treatment_thumbnail_upload_path(instance, filename):
     return f"treatments/thumbnails/{filename}"
 
 
+class TreatmentQuerySet(models.QuerySet):
+    # Columns of the list cards and pickers, everything but the description HTML
+    LISTING_FIELDS = [
+        'id', 'title_hr', 'title_en', 'slug_hr', 'slug_en', 'short_description_hr', 'short_description_en',
+        'price', 'duration_hours', 'duration_minutes', 'thumbnail', 'thumbnail_variants', 'thumbnail_width', 'thumbnail_height', 'created_at',
+    ]
+    
+    def for_listing(self):
+        """Load only the columns list pages use, leaving out the large rich text fields"""
+        return self.only(*self.LISTING_FIELDS)
+
+
 class Treatment(models.Model):
     # Croatian fields
     title_hr = models.CharField(_('Title (Croatian)'), max_length=200)
     slug_hr = models.SlugField(_('Slug (Croatian)'), max_length=200, unique=True)
     short_description_hr = models.TextField(_('Short Description (Croatian)'), max_length=500)
     full_description_hr = RichTextUploadingField(_('Full Description (Croatian)'))
+    full_description_hr_rendered = models.TextField(_('Rendered Full Description (Croatian)'), blank=True, editable=False, help_text=_('Post-processed HTML, generated on save'))
     meta_description_hr = models.CharField(_('Meta Description (Croatian)'), max_length=160, blank=True)
     
     # English fields
@@ -24,6 +37,7 @@ class Treatment(models.Model):
     slug_en = models.SlugField(_('Slug (English)'), max_length=200, unique=True)
     short_description_en = models.TextField(_('Short Description (English)'), max_length=500)
     full_description_en = RichTextUploadingField(_('Full Description (English)'))
+    full_description_en_rendered = models.TextField(_('Rendered Full Description (English)'), blank=True, editable=False, help_text=_('Post-processed HTML, generated on save'))
     meta_description_en = models.CharField(_('Meta Description (English)'), max_length=160, blank=True)
     
     # Common fields
@@ -33,12 +47,21 @@ class Treatment(models.Model):
     pause_minutes = models.PositiveIntegerField(_('Pause After Treatment (Minutes)'), default=0, validators=[MinValueValidator(0)], help_text=_('Rest time needed after this treatment (not visible to users)'))
     price = models.DecimalField(_('Price'), max_digits=10, decimal_places=2)
     thumbnail = models.ImageField(_('Thumbnail Image'), upload_to=treatment_thumbnail_upload_path, help_text=_('Supports WebP format'))
+    thumbnail_variants = models.JSONField(_('Thumbnail Variants'), default=dict, blank=True, editable=False, help_text=_('Responsive renditions generated from the thumbnail'))
+    thumbnail_width = models.PositiveIntegerField(_('Thumbnail Width'), null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(_('Thumbnail Height'), null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(_('Active'), default=True)
     
+    objects = TreatmentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the list pages
+            models.Index(fields=['created_at', 'id'], name='treatment_created_id_idx'),
+        ]
         verbose_name = _('Treatment')
         verbose_name_plural = _('Treatments')
     
@@ -86,6 +109,10 @@ class Treatment(models.Model):
         """Get full description in specified language"""
         return getattr(self, f'full_description_{language_code}', self.full_description_hr)
     
+    def get_full_description_html(self, language_code='hr'):
+        """Get the full description HTML rendered at save time, or the raw HTML if not rendered yet"""
+        return getattr(self, f'full_description_{language_code}_rendered', '') or self.get_full_description(language_code)
+    
     def get_meta_description(self, language_code='hr'):
         """Get meta description in specified language"""
         return getattr(self, f'meta_description_{language_code}', self.meta_description_hr)
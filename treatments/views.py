@@ -1,18 +1,25 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.translation import get_language
 from django.db.models import Q
+from core import page_cache
+from core.conditional import conditional_detail, conditional_list
+from core.pagination import KeysetPaginator
 from .models import Treatment
 
+LIST_PER_PAGE = 4
 
+
+@conditional_list(Treatment)
 def treatment_list(request):
     """List all treatments with pagination"""
     language_code = get_language()[:2]
-    treatments = Treatment.objects.filter(is_active=True).order_by('-created_at')
+    treatments = Treatment.objects.filter(is_active=True).for_listing().order_by('-created_at')
     
-    paginator = Paginator(treatments, 4)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(treatments, LIST_PER_PAGE)
+    if 'page' in request.GET:
+        # Page number links from before keyset pagination
+        return redirect(request.path + paginator.get_page_number_query(request.GET['page']), permanent=True)
+    page_obj = paginator.get_page(request.GET.get('after'))
     
     context = {
         'page_obj': page_obj,
@@ -22,19 +29,21 @@ def treatment_list(request):
     return render(request, 'treatments/list.html', context)
 
 
+@conditional_detail(Treatment)
 def treatment_detail(request, slug):
     """Individual treatment detail page"""
     language_code = get_language()[:2]
     
-    # Try to find treatment by slug in current language
-    if language_code == 'en':
-        treatment = get_object_or_404(Treatment, slug_en=slug, is_active=True)
-    else:
-        treatment = get_object_or_404(Treatment, slug_hr=slug, is_active=True)
+    def get_context():
+        # Only runs when the page is not cached
+        if language_code == 'en':
+            treatment = get_object_or_404(Treatment, slug_en=slug, is_active=True)
+        else:
+            treatment = get_object_or_404(Treatment, slug_hr=slug, is_active=True)
+        return {
+            'treatment': treatment,
+            'language_code': language_code,
+        }
     
-    context = {
-        'treatment': treatment,
-        'language_code': language_code,
-    }
-    return render(request, 'treatments/detail.html', context)
+    return page_cache.cached_detail(request, Treatment, language_code, slug, 'treatments/detail.html', get_context)
 